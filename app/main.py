@@ -1,14 +1,33 @@
 """BandLens FastAPI application factory."""
 from __future__ import annotations
 
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from app.repositories.embedding import EmbeddingRepository
+from app.repositories.feedback import FeedbackRepository
 from app.routes import feedback, match, upload
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create the per-process repositories the route dependencies read."""
+    app.state.embedding_repo = EmbeddingRepository()
+    app.state.feedback_repo = FeedbackRepository()
+    yield
+
+
+# No default_response_class: every route declares a response_model, which lets
+# FastAPI dump it to JSON bytes in pydantic-core. A custom class such as
+# ORJSONResponse would disable that path and round-trip through a dict.
 app = FastAPI(
     title="BandLens",
     description="Image embedding upload, similarity search, and feedback API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 v1 = app
@@ -23,9 +42,22 @@ def health() -> dict:
 
 
 def main() -> None:
+    """Serve the app with uvicorn.
+
+    Upload hashing and match scoring are CPU-bound, so throughput scales with
+    worker processes; set ``WEB_CONCURRENCY`` (e.g. to ``os.cpu_count()``) to
+    run more than one. Each worker builds its own in-memory repositories in
+    ``lifespan`` and they are not shared, so an upload is only visible to
+    ``/v1/match`` and ``/v1/feedback`` on the worker that stored it. The
+    default therefore stays at a single worker until a shared backend exists.
+    """
     import uvicorn
 
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=False)
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    # uvicorn's default loop/http selection already uses uvloop and httptools
+    # when uvicorn[standard] installed them, and falls back where they are
+    # unavailable (Windows, PyPy).
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=False, workers=workers)
 
 
 if __name__ == "__main__":
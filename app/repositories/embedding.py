@@ -2,48 +2,279 @@
 from __future__ import annotations
 
 import math
-from dataclasses import dataclass, field
+import threading
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # optional: pip install "swe-af[ann]"
+    hnswlib = None
+
+try:
+    import faiss
+except ImportError:  # optional: pip install "swe-af[ann]"
+    faiss = None
+
+_EMBEDDING_DIM = 512
+_UNIT_NORM_TOL = 1e-6
+
+# HNSW index parameters. Below _ANN_MIN_RECORDS the exact matrix product is
+# both faster and exact, so the index is only built once the store grows.
+_ANN_MIN_RECORDS = 1000
+_ANN_M = 16
+_ANN_EF_CONSTRUCTION = 200
+_ANN_EF_SEARCH = 64
+
+# IVF-PQ index parameters. The coarse quantiser gets about one cell per
+# _PQ_POINTS_PER_CELL training rows (capped at _PQ_NLIST), and each query
+# fetches _PQ_RERANK times as many candidates as it returns so the exact
+# re-rank can recover neighbours the 4-bit codes misorder.
+_PQ_NLIST = 256
+_PQ_POINTS_PER_CELL = 39
+_PQ_NPROBE = 16
+_PQ_M = 64
+_PQ_NBITS = 4
+_PQ_TRAIN_ROWS = 10_000
+_PQ_RERANK = 8
+
+# int8 scalar quantisation: each row stores round(v / max|v| * 127) plus its
+# scale. Scoring casts blocks of rows back to float32 so the product still
+# runs through BLAS while the temporary stays cache-sized.
+_QUANT_LEVELS = 127
+_QUANT_BLOCK_ROWS = 1024
 
 
 @dataclass
 class EmbeddingRecord:
     embedding_id: str
     request_id: str
-    embedding: list[float]
+    embedding: np.ndarray  # float32, shape (dim,)
+
+
+def _unit(vec: np.ndarray | Sequence[float]) -> np.ndarray:
+    """Return *vec* L2-normalised along its last axis as float32.
+
+    Accepts a single vector or a ``(rows, dim)`` batch; zero vectors stay
+    zero. Embeddings from ``/v1/upload`` are already unit length, so they are
+    only converted, not divided again.
+    """
+    arr = np.asarray(vec, dtype=np.float32)
+    norms = np.linalg.norm(arr, axis=-1, keepdims=True)
+    rescale = (norms > 0.0) & (np.abs(norms - 1.0) > _UNIT_NORM_TOL)
+    if rescale.any():
+        arr = arr / np.where(rescale, norms, 1.0)
+    return arr
+
+
+def _quantize(vec: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return ``(codes, scale)`` with ``codes * scale`` approximating *vec*.
+
+    Works row-wise on a batch; *scale* has the shape of *vec* minus its last
+    axis.
+    """
+    scale = np.max(np.abs(vec), axis=-1, keepdims=True) / _QUANT_LEVELS
+    codes = np.rint(vec / np.where(scale > 0.0, scale, 1.0)).astype(np.int8)
+    return codes, scale[..., 0]
+
+
+class _HnswIndex:
+    """HNSW graph over the stored rows; labels are row numbers."""
+
+    available = hnswlib is not None
+
+    def __init__(self, rows: np.ndarray, capacity: int) -> None:
+        # Rows are unit length, so inner product equals cosine similarity and
+        # hnswlib need not renormalise.
+        self._index = hnswlib.Index(space="ip", dim=rows.shape[1])
+        self._index.init_index(
+            max_elements=capacity,
+            ef_construction=_ANN_EF_CONSTRUCTION,
+            M=_ANN_M,
+        )
+        self._index.add_items(rows, np.arange(len(rows)))
+
+    def add(self, rows: np.ndarray, start: int, capacity: int) -> None:
+        stop = start + len(rows)
+        if self._index.get_max_elements() < stop:
+            self._index.resize_index(capacity)
+        self._index.add_items(rows, np.arange(start, stop))
+
+    def candidates(self, query: np.ndarray, k: int) -> np.ndarray:
+        self._index.set_ef(max(_ANN_EF_SEARCH, k))
+        labels, _ = self._index.knn_query(query, k=k)
+        return labels[0].astype(np.intp)
 
 
-def _cosine_similarity(a: list[float], b: list[float]) -> float:
-    dot = sum(x * y for x, y in zip(a, b))
-    norm_a = math.sqrt(sum(x * x for x in a))
-    norm_b = math.sqrt(sum(x * x for x in b))
-    if norm_a == 0.0 or norm_b == 0.0:
-        return 0.0
-    return dot / (norm_a * norm_b)
+class _IvfPqIndex:
+    """FAISS IVF-PQ coarse filter; labels are row numbers.
+
+    Trained once on the rows present when it is built, so build it after the
+    store holds a representative sample.
+    """
+
+    available = faiss is not None
+
+    def __init__(self, rows: np.ndarray, capacity: int) -> None:
+        dim = rows.shape[1]
+        nlist = max(1, min(_PQ_NLIST, len(rows) // _PQ_POINTS_PER_CELL))
+        # PQ needs the dimension to split evenly into sub-quantisers.
+        m = math.gcd(dim, _PQ_M)
+        self._quantizer = faiss.IndexFlatIP(dim)
+        self._index = faiss.IndexIVFPQ(
+            self._quantizer, dim, nlist, m, _PQ_NBITS, faiss.METRIC_INNER_PRODUCT
+        )
+        self._index.train(np.ascontiguousarray(rows[:_PQ_TRAIN_ROWS]))
+        self._index.nprobe = min(_PQ_NPROBE, nlist)
+        self.add(rows, 0, capacity)
+
+    def add(self, rows: np.ndarray, start: int, capacity: int) -> None:
+        ids = np.arange(start, start + len(rows), dtype=np.int64)
+        self._index.add_with_ids(np.ascontiguousarray(rows), ids)
+
+    def candidates(self, query: np.ndarray, k: int) -> np.ndarray:
+        _, labels = self._index.search(query[None, :], k * _PQ_RERANK)
+        labels = labels[0]
+        return labels[labels >= 0].astype(np.intp)
+
+
+_ANN_BACKENDS = {"hnsw": _HnswIndex, "ivfpq": _IvfPqIndex}
 
 
 class EmbeddingRepository:
-    """Thread-unsafe in-memory store; sufficient for single-process MVP."""
+    """In-memory store for a single process; saves and searches are serialised.
+
+    ``/v1/match`` searches on a worker thread while ``/v1/upload`` saves on the
+    event loop, so one lock covers both: neither the ANN libraries nor the
+    matrix swap in ``_reserve`` tolerate a search racing an append.
+
+    Embeddings are kept L2-normalised in one contiguous ``(capacity, dim)``
+    float32 matrix, so a search is a single matrix-vector product. When the
+    store reaches *ann_threshold* records and the *ann_backend* library is
+    installed, searches instead take candidates from an approximate index
+    (``"hnsw"`` via hnswlib, or ``"ivfpq"`` via FAISS) and re-rank them
+    exactly; pass ``ann_threshold=None`` to always search exactly.
+
+    With ``quantize=True`` rows are stored as int8 codes with a per-row
+    float32 scale, cutting the matrix to a quarter of its size at the cost of
+    roughly 1e-3 error in the returned similarities.
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        dim: int = _EMBEDDING_DIM,
+        ann_threshold: int | None = _ANN_MIN_RECORDS,
+        quantize: bool = False,
+        ann_backend: str = "hnsw",
+    ) -> None:
+        if ann_backend not in _ANN_BACKENDS:
+            raise ValueError(f"Unknown ann_backend: {ann_backend!r}")
+        self._dim = dim
+        self._index_cls = _ANN_BACKENDS[ann_backend]
+        self._ann_threshold = ann_threshold if self._index_cls.available else None
         self._records: list[EmbeddingRecord] = []
+        self._by_request_id: dict[str, EmbeddingRecord] = {}
+        self._by_embedding_id: dict[str, EmbeddingRecord] = {}
+        self._matrix = np.empty((0, dim), dtype=np.int8 if quantize else np.float32)
+        self._scales = np.empty(0, dtype=np.float32) if quantize else None
+        self._index = None
+        self._lock = threading.Lock()
 
     def save(self, record: EmbeddingRecord) -> None:
-        self._records.append(record)
+        self.save_many([record])
+
+    def save_many(self, records: Sequence[EmbeddingRecord]) -> None:
+        """Append *records* with a single capacity check and block write."""
+        if not records:
+            return
+        with self._lock:
+            self._append(records)
+
+    def _append(self, records: Sequence[EmbeddingRecord]) -> None:
+        start = len(self._records)
+        stop = start + len(records)
+        self._reserve(stop)
+        rows = _unit([record.embedding for record in records])
+        if self._scales is None:
+            self._matrix[start:stop] = rows
+        else:
+            self._matrix[start:stop], self._scales[start:stop] = _quantize(rows)
+        for record in records:
+            self._records.append(record)
+            self._by_request_id.setdefault(record.request_id, record)
+            self._by_embedding_id.setdefault(record.embedding_id, record)
+
+        if self._index is not None:
+            self._index.add(self._rows(slice(start, stop)), start, self._matrix.shape[0])
+        elif self._ann_threshold is not None and stop >= self._ann_threshold:
+            self._index = self._index_cls(self._rows(slice(0, stop)), self._matrix.shape[0])
+
+    def _reserve(self, size: int) -> None:
+        # Capacity doubles like list.append, so n saves copy O(n) rows in total.
+        capacity = self._matrix.shape[0]
+        if size <= capacity:
+            return
+        capacity = max(16, 2 * capacity, size)
+        grown = np.empty((capacity, self._dim), dtype=self._matrix.dtype)
+        grown[: len(self._records)] = self._matrix[: len(self._records)]
+        self._matrix = grown
+        if self._scales is not None:
+            self._scales = np.resize(self._scales, capacity)
+
+    def _rows(self, rows: slice | np.ndarray) -> np.ndarray:
+        """Return the selected rows as float32, dequantising if needed."""
+        selected = self._matrix[rows]
+        if self._scales is None:
+            return selected
+        return selected.astype(np.float32) * self._scales[rows, None]
+
+    def _scores(self, query: np.ndarray, n: int) -> np.ndarray:
+        if self._scales is None:
+            return self._matrix[:n] @ query
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, _QUANT_BLOCK_ROWS):
+            stop = min(start + _QUANT_BLOCK_ROWS, n)
+            block = self._matrix[start:stop].astype(np.float32) @ query
+            scores[start:stop] = block * self._scales[start:stop]
+        return scores
 
     def find_by_request_id(self, request_id: str) -> EmbeddingRecord | None:
-        for r in self._records:
-            if r.request_id == request_id:
-                return r
-        return None
+        return self._by_request_id.get(request_id)
+
+    def find_by_embedding_id(self, embedding_id: str) -> EmbeddingRecord | None:
+        return self._by_embedding_id.get(embedding_id)
 
-    def search(self, query: list[float], top_k: int = 3) -> list[tuple[EmbeddingRecord, float]]:
+    def search(self, query: np.ndarray, top_k: int = 3) -> list[tuple[EmbeddingRecord, float]]:
         """Return up to *top_k* records ranked by cosine similarity descending."""
-        scored = [
-            (r, _cosine_similarity(query, r.embedding))
-            for r in self._records
-        ]
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return scored[:top_k]
+        with self._lock:
+            return self._search(query, top_k)
+
+    def _search(self, query: np.ndarray, top_k: int) -> list[tuple[EmbeddingRecord, float]]:
+        n = len(self._records)
+        if n == 0 or top_k <= 0:
+            return []
+        k = min(top_k, n)
+        query_vec = _unit(query)
+        if self._index is not None:
+            # Exact re-rank of the index candidates against the stored rows.
+            idx = self._index.candidates(query_vec, k)
+            scores = self._rows(idx) @ query_vec
+            order = np.argsort(-scores, kind="stable")[:k]
+            return [(self._records[idx[i]], float(scores[i])) for i in order]
+        # O(n) top-k selection: take the right end of the partition rather
+        # than partitioning a negated copy of the whole score vector, and
+        # skip the partition entirely when every row is returned anyway.
+        scores = self._scores(query_vec, n)
+        idx = np.argpartition(scores, n - k)[n - k :] if k < n else np.arange(n)
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+        return [(self._records[i], float(scores[i])) for i in idx]
 
     def count(self) -> int:
         return len(self._records)
+
+    @property
+    def ann_active(self) -> bool:
+        """True once searches go through the approximate index."""
+        return self._index is not None
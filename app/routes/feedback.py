@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from enum import Enum
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
 from app.repositories.embedding import EmbeddingRepository
@@ -12,12 +12,10 @@ from app.routes.upload import get_embedding_repo
 
 router = APIRouter()
 
-# Module-level singleton; tests may replace via app.dependency_overrides.
-_feedback_repo: FeedbackRepository = FeedbackRepository()
 
-
-def get_feedback_repo() -> FeedbackRepository:
-    return _feedback_repo
+def get_feedback_repo(request: Request) -> FeedbackRepository:
+    # Created by the app lifespan; tests may replace via app.dependency_overrides.
+    return request.app.state.feedback_repo
 
 
 class Judgment(str, Enum):
@@ -38,7 +36,7 @@ class FeedbackResponse(BaseModel):
 
 
 @router.post("/feedback", response_model=FeedbackResponse)
-def submit_feedback(
+async def submit_feedback(
     req: FeedbackRequest,
     embedding_repo: EmbeddingRepository = Depends(get_embedding_repo),
     fb_repo: FeedbackRepository = Depends(get_feedback_repo),
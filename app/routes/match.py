@@ -1,8 +1,12 @@
 """POST /v1/match — find top-3 embeddings by cosine similarity."""
 from __future__ import annotations
 
+from typing import Annotated
+
+import anyio
+import numpy as np
 from fastapi import APIRouter, Depends
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, PlainValidator, WithJsonSchema
 
 from app.repositories.embedding import EmbeddingRepository
 from app.routes.upload import get_embedding_repo
@@ -12,8 +16,38 @@ router = APIRouter()
 _EMBEDDING_DIM = 512
 
 
+def _parse_embedding(value: object) -> np.ndarray:
+    """Convert the JSON array in one NumPy call instead of validating each float."""
+    try:
+        with np.errstate(over="ignore"):
+            arr = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"embedding must be an array of numbers: {exc}") from None
+    # null elements become NaN and values beyond float32 range become inf;
+    # both would otherwise clamp to a perfect confidence of 1.0
+    if not np.isfinite(arr).all():
+        raise ValueError("embedding must contain only finite numbers")
+    if arr.shape != (_EMBEDDING_DIM,):
+        raise ValueError(f"embedding must contain exactly {_EMBEDDING_DIM} numbers")
+    return arr
+
+
+Embedding = Annotated[
+    np.ndarray,
+    PlainValidator(_parse_embedding),
+    WithJsonSchema(
+        {
+            "type": "array",
+            "items": {"type": "number"},
+            "minItems": _EMBEDDING_DIM,
+            "maxItems": _EMBEDDING_DIM,
+        }
+    ),
+]
+
+
 class MatchRequest(BaseModel):
-    embedding: list[float] = Field(..., min_length=_EMBEDDING_DIM, max_length=_EMBEDDING_DIM)
+    embedding: Embedding
 
 
 class MatchResult(BaseModel):
@@ -28,11 +62,13 @@ class MatchResponse(BaseModel):
 
 
 @router.post("/match", response_model=MatchResponse)
-def match_embedding(
+async def match_embedding(
     req: MatchRequest,
     repo: EmbeddingRepository = Depends(get_embedding_repo),
 ) -> MatchResponse:
-    results = repo.search(req.embedding, top_k=3)
+    # The search is CPU-bound but NumPy releases the GIL inside the matrix
+    # product, so run it on a worker thread and keep the event loop free.
+    results = await anyio.to_thread.run_sync(repo.search, req.embedding, 3)
     matches = [
         MatchResult(
             rank=rank + 1,
@@ -1,27 +1,32 @@
 """POST /v1/upload — accept an image file and store its embedding."""
 from __future__ import annotations
 
-import hashlib
-import struct
+import functools
 import uuid
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+import blake3
+import numpy as np
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
 from pydantic import BaseModel
 
 from app.repositories.embedding import EmbeddingRecord, EmbeddingRepository
 
 router = APIRouter()
 
-# Module-level singleton; tests may replace via app.dependency_overrides.
-_embedding_repo: EmbeddingRepository = EmbeddingRepository()
 
-
-def get_embedding_repo() -> EmbeddingRepository:
-    return _embedding_repo
+def get_embedding_repo(request: Request) -> EmbeddingRepository:
+    # Created by the app lifespan; tests may replace via app.dependency_overrides.
+    return request.app.state.embedding_repo
 
 # Limits
 _MAX_FILE_BYTES = 10 * 1024 * 1024  # 10 MB
+_READ_CHUNK_BYTES = 64 * 1024
+_FORMAT_PROBE_BYTES = 12  # enough for every magic, including RIFF????WEBP
 _EMBEDDING_DIM = 512
+# One big-endian int32 per component, read from the BLAKE3 output stream.
+_EMBEDDING_BYTES = _EMBEDDING_DIM * 4
+# Embeddings memoised by content digest, so repeat uploads skip the chain.
+_EMBEDDING_CACHE_SIZE = 1024
 
 # Accepted image magic bytes
 _MAGIC = {
@@ -32,6 +37,16 @@ _MAGIC = {
     b"RIFF": "webp",  # RIFF....WEBP
 }
 
+# Magic prefixes grouped by length, longest first, so detection costs one
+# slice and one dict lookup per distinct length instead of one per magic.
+_MAGIC_BY_LEN: tuple[tuple[int, dict[bytes, str]], ...] = tuple(
+    (n, {magic: fmt for magic, fmt in _MAGIC.items() if len(magic) == n})
+    for n in sorted({len(magic) for magic in _MAGIC}, reverse=True)
+)
+# RIFF is a generic container; WebP files carry their form type at 8:12.
+_RIFF_FORM_TYPE = slice(8, 12)
+_WEBP_FORM_TYPE = b"WEBP"
+
 
 class UploadResponse(BaseModel):
     request_id: str
@@ -41,41 +56,80 @@ class UploadResponse(BaseModel):
 
 
 def _detect_format(data: bytes) -> str | None:
-    for magic, fmt in _MAGIC.items():
-        if data[: len(magic)] == magic:
-            if fmt == "webp":
-                # RIFF????WEBP
-                if len(data) >= 12 and data[8:12] == b"WEBP":
-                    return "webp"
+    for n, magics in _MAGIC_BY_LEN:
+        fmt = magics.get(data[:n])
+        if fmt is not None:
+            if fmt == "webp" and data[_RIFF_FORM_TYPE] != _WEBP_FORM_TYPE:
                 return None
             return fmt
     return None
 
 
-def _compute_embedding(data: bytes) -> list[float]:
+def _compute_embedding(data: bytes) -> np.ndarray:
     """Produce a deterministic 512-dim unit-normalised embedding from raw bytes.
 
-    The approach: generate 512 floats by hashing successive 64-byte windows
-    of the data (using SHA-256), then L2-normalise the vector.
+    The approach: take the BLAKE3 digest of the data, stretch it to 512
+    floats with BLAKE3's extendable output, then L2-normalise the vector.
+    The result is a read-only float32 array shared with the memo cache.
+    """
+    return _embedding_from_digest(blake3.blake3(data).digest())
+
+
+@functools.lru_cache(maxsize=_EMBEDDING_CACHE_SIZE)
+def _embedding_from_digest(seed: bytes) -> np.ndarray:
+    """Expand the content digest *seed* into the embedding components.
+
+    Keying on the digest lets identical uploads share a cache entry without
+    hashing the data twice.
     """
-    floats: list[float] = []
-    seed = data
-    while len(floats) < _EMBEDDING_DIM:
-        digest = hashlib.sha256(seed).digest()
-        # Interpret each 4-byte group as a signed int32, normalise to [-1, 1]
-        for i in range(0, len(digest), 4):
-            val = struct.unpack_from(">i", digest, i)[0]
-            floats.append(val / 2_147_483_648.0)
-        seed = digest  # chain hashes
-
-    floats = floats[:_EMBEDDING_DIM]
+    stream = blake3.blake3(seed).digest(length=_EMBEDDING_BYTES)
+
+    # Interpret each 4-byte group as a signed int32, normalise to [-1, 1]
+    vec = np.frombuffer(stream, dtype=">i4").astype(np.float32)
+    vec *= 1.0 / 2_147_483_648.0
 
     # L2 normalise
-    norm = sum(x * x for x in floats) ** 0.5
+    norm = float(np.linalg.norm(vec))
     if norm > 0:
-        floats = [x / norm for x in floats]
+        vec /= norm
+
+    vec.flags.writeable = False
+    return vec
 
-    return floats
+
+def _unsupported_format() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail="Unsupported file format. Upload a PNG, JPEG, GIF, or WebP image.",
+    )
+
+
+async def _read_image(file: UploadFile) -> tuple[bytes, str]:
+    """Read *file* in chunks, rejecting it as soon as it is too large or
+    its leading bytes are not a supported image format."""
+    buf = bytearray()
+    fmt: str | None = None
+    while chunk := await file.read(_READ_CHUNK_BYTES):
+        buf += chunk
+        if len(buf) > _MAX_FILE_BYTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File too large: max {_MAX_FILE_BYTES // (1024 * 1024)} MB",
+            )
+        if fmt is None and len(buf) >= _FORMAT_PROBE_BYTES:
+            fmt = _detect_format(bytes(buf[:_FORMAT_PROBE_BYTES]))
+            if fmt is None:
+                raise _unsupported_format()
+
+    if not buf:
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    if fmt is None:
+        fmt = _detect_format(bytes(buf))
+        if fmt is None:
+            raise _unsupported_format()
+
+    return bytes(buf), fmt
 
 
 @router.post("/upload", response_model=UploadResponse)
@@ -83,23 +137,7 @@ async def upload_image(
     file: UploadFile = File(...),
     repo: EmbeddingRepository = Depends(get_embedding_repo),
 ) -> UploadResponse:
-    data = await file.read()
-
-    if not data:
-        raise HTTPException(status_code=400, detail="Empty file")
-
-    if len(data) > _MAX_FILE_BYTES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large: max {_MAX_FILE_BYTES // (1024 * 1024)} MB",
-        )
-
-    fmt = _detect_format(data)
-    if fmt is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Unsupported file format. Upload a PNG, JPEG, GIF, or WebP image.",
-        )
+    data, fmt = await _read_image(file)
 
     request_id = str(uuid.uuid4())
     embedding_id = str(uuid.uuid4())
@@ -4,12 +4,29 @@ BI-Quality Pipeline Analysis
 =============================
 Generates insight-driven visualizations for autonomous SWE pipeline execution.
 Every chart answers a specific question at a glance.
+
+Writes a notebook by default; pass --charts-only to render just the PNGs.
 """
 
+import argparse
+import base64
+import hashlib
+import io
 import json
+import mmap
+import os
+import pickle
 import re
 import nbformat
+import numpy as np
+import pandas as pd
+try:
+    from orjson import loads as _loads  # optional; also decodes memoryviews without a copy
+except ImportError:
+    def _loads(buf):
+        return json.loads(bytes(buf))
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
@@ -28,120 +45,281 @@ CHART_DIR = Path(
     "/Users/santoshkumarradha/Documents/agentfield/code/int-agentfield-examples/"
     "af-swe/example-diagrams/charts"
 )
+# Below this many log files a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 64
+# Bump when the parsed row layout changes so stale cache entries are ignored
+PARSE_CACHE_VERSION = 2
+
+# Column layout of the parsed records. str columns take their width from the
+# data; iter is an int for coders, a hex string for review/QA/synthesis
+# iterations and None elsewhere, so it stays an object column.
+RECORD_FIELDS = [
+    ('file', str),
+    ('category', str),
+    ('issue', str),
+    ('iter', object),
+    ('start_ts', 'f8'),
+    ('end_ts', 'f8'),
+    ('duration_s', 'f8'),
+    ('duration_ms', 'i8'),
+    ('cost', 'f8'),
+    ('num_turns', 'i8'),
+    ('tool_calls', 'i8'),
+    ('text_chars', 'i8'),
+    ('text_blocks', 'i8'),
+    ('est_input_tokens', 'f8'),
+    ('est_output_tokens', 'f8'),
+    ('model', str),
+    ('is_error', '?'),
+]
+# Filled in by parse_all for all records at once; _parse_log rows omit them
+DERIVED_FIELDS = ('est_input_tokens', 'est_output_tokens')
+PARSED_FIELDS = [f for f in RECORD_FIELDS if f[0] not in DERIVED_FIELDS]
 
 # ---------------------------------------------------------------------------
 # Parse all logs
 # ---------------------------------------------------------------------------
+_PLANNING_STEMS = frozenset({'product_manager', 'architect', 'tech_lead', 'sprint_planner'})
+_RX_CODER = re.compile(r'coder_(.+)_iter_(\d+)')
+_RX_REVIEWER = re.compile(r'reviewer_(.+)_iter_([a-f0-9]+)')
+_RX_QA = re.compile(r'qa_(.+)_iter_([a-f0-9]+)')
+_RX_SYN = re.compile(r'synthesizer_(.+)_iter_([a-f0-9]+)')
+_RX_MERGER = re.compile(r'merger_level_(\d+)')
+_RX_INT = re.compile(r'integration_tester_level_(\d+)')
+_RX_WS = re.compile(r'workspace_(setup|cleanup)_level_(\d+)')
+
+
+_HEX_DIGITS = '0123456789abcdef'
+_WS_PREFIXES = ('setup_level_', 'cleanup_level_')
+
+
+# Each parser gets the full stem and the text after its first '_'. Well-formed
+# stems are split with str methods; anything unusual falls back to the regex
+# so results match it exactly. None means "not this category".
+def _iter_parser(cat, rx, hex_iter):
+    def parse(stem, rest):
+        issue, _, it = rest.rpartition('_iter_')
+        if issue and it:
+            if hex_iter and not it.strip(_HEX_DIGITS):
+                return cat, issue, it
+            if not hex_iter and it.isdecimal():
+                return cat, issue, int(it)
+        m = rx.match(stem)
+        if m: return cat, m.group(1), m.group(2) if hex_iter else int(m.group(2))
+        return None
+    return parse
+
+
+def _level_parser(cat, rest_prefix, rx):
+    def parse(stem, rest):
+        level = rest[len(rest_prefix):]
+        if rest.startswith(rest_prefix) and level.isdecimal():
+            return cat, f'level_{level}', int(level)
+        m = rx.match(stem)
+        if m: return cat, f'level_{m.group(1)}', int(m.group(1))
+        return None
+    return parse
+
+
+def _parse_issue_writer(stem, rest):
+    if rest.startswith('writer_'):
+        return 'issue_writer', stem[len('issue_writer_'):], None
+    return None
+
+
+def _parse_workspace(stem, rest):
+    if rest.startswith(_WS_PREFIXES):
+        kind, _, level = rest.partition('_level_')
+        if level.isdecimal():
+            return 'workspace', f'{kind}_level_{level}', None
+    m = _RX_WS.match(stem)
+    if m: return 'workspace', f'{m.group(1)}_level_{m.group(2)}', None
+    return None
+
+
+_PREFIX = {
+    'issue': _parse_issue_writer,
+    'coder': _iter_parser('coder', _RX_CODER, hex_iter=False),
+    'reviewer': _iter_parser('reviewer', _RX_REVIEWER, hex_iter=True),
+    'qa': _iter_parser('qa', _RX_QA, hex_iter=True),
+    'synthesizer': _iter_parser('synthesizer', _RX_SYN, hex_iter=True),
+    'merger': _level_parser('merger', 'level_', _RX_MERGER),
+    'integration': _level_parser('integration_tester', 'tester_level_', _RX_INT),
+    'workspace': _parse_workspace,
+}
+
+
 def classify(stem):
-    if stem in ('product_manager', 'architect', 'tech_lead', 'sprint_planner'):
+    if stem in _PLANNING_STEMS:
         return 'planning', stem, None
-    if stem.startswith('issue_writer_'):
-        return 'issue_writer', stem[len('issue_writer_'):], None
-    m = re.match(r'coder_(.+)_iter_(\d+)', stem)
-    if m: return 'coder', m.group(1), int(m.group(2))
-    m = re.match(r'reviewer_(.+)_iter_([a-f0-9]+)', stem)
-    if m: return 'reviewer', m.group(1), m.group(2)
-    m = re.match(r'qa_(.+)_iter_([a-f0-9]+)', stem)
-    if m: return 'qa', m.group(1), m.group(2)
-    m = re.match(r'synthesizer_(.+)_iter_([a-f0-9]+)', stem)
-    if m: return 'synthesizer', m.group(1), m.group(2)
-    m = re.match(r'merger_level_(\d+)', stem)
-    if m: return 'merger', f'level_{m.group(1)}', int(m.group(1))
-    m = re.match(r'integration_tester_level_(\d+)', stem)
-    if m: return 'integration_tester', f'level_{m.group(1)}', int(m.group(1))
-    m = re.match(r'workspace_(setup|cleanup)_level_(\d+)', stem)
-    if m: return f'workspace', f'{m.group(1)}_level_{m.group(2)}', None
-    return 'other', stem, None
+    head, _, rest = stem.partition('_')
+    parse = _PREFIX.get(head)
+    return (parse and parse(stem, rest)) or ('other', stem, None)
+
+
+def _read_events(lf):
+    # Walk newline offsets in a read-only mapping and decode each line from a
+    # view of it, so the file is never copied into Python line objects.
+    # Blank lines fail to decode and are skipped along with malformed ones.
+    size = lf.stat().st_size
+    if size == 0:
+        return []
+    events = []
+    with open(lf, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        pos = 0
+        while pos < size:
+            end = mm.find(b'\n', pos)
+            if end < 0:
+                end = size
+            if end > pos:
+                try: events.append(_loads(view[pos:end]))
+                except ValueError: pass
+            pos = end + 1
+    return events
+
+
+def _parse_log(lf):
+    events = _read_events(lf)
+    if not events:
+        return None
+
+    cat, issue, iter_num = classify(lf.stem)
+    first_ts = events[0].get('ts', 0)
+    last_ts = events[-1].get('ts', 0)
+
+    cost = 0.0
+    num_turns = 0
+    duration_ms = 0
+    model = events[0].get('model', 'unknown') if events[0].get('event') == 'start' else 'unknown'
+    is_error = False
+    tool_calls = 0
+    text_chars = 0
+    text_blocks = 0
+
+    # Single pass: assistant turns are by far the most common event
+    for e in events:
+        ev = e.get('event')
+        if ev == 'assistant':
+            for c in e.get('content', []):
+                # Decoded JSON objects are always exact dicts
+                if type(c) is dict:
+                    t = c.get('type')
+                    if t == 'tool_use':
+                        tool_calls += 1
+                    elif t == 'text':
+                        text_chars += len(c.get('text', ''))
+                        text_blocks += 1
+        elif ev == 'result':
+            cost = e.get('cost_usd', 0) or 0
+            num_turns = e.get('num_turns', 0) or 0
+            duration_ms = e.get('duration_ms', 0) or 0
+        elif ev == 'end':
+            is_error = e.get('is_error', False)
+
+    # One row in PARSED_FIELDS order
+    return (
+        lf.name, cat, issue, iter_num,
+        first_ts, last_ts, last_ts - first_ts, duration_ms,
+        cost, num_turns, tool_calls, text_chars, text_blocks,
+        model, is_error,
+    )
+
+
+def _parse_one(lf):
+    # Logs rarely change between runs, so reuse the row parsed last time while
+    # the file's mtime and size are unchanged. Entries are named after a hash
+    # of the resolved path, so runs whose logs share stems never collide.
+    st = lf.stat()
+    key = (PARSE_CACHE_VERSION, st.st_mtime_ns, st.st_size)
+    digest = hashlib.sha1(str(lf.resolve()).encode()).hexdigest()[:16]
+    cache = CHART_DIR / '.cache' / f'{lf.stem}-{digest}.pkl'
+    try:
+        with open(cache, 'rb') as f:
+            cached_key, row = pickle.load(f)
+        if cached_key == key:
+            return row
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    row = _parse_log(lf)
+    # The cache is optional: skip it if the chart directory is not writable,
+    # and write under a temporary name so an interrupted worker cannot leave
+    # a truncated entry behind.
+    tmp = cache.with_name(f'{cache.name}.{os.getpid()}.tmp')
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, 'wb') as f:
+            pickle.dump((key, row), f)
+        os.replace(tmp, cache)
+    except OSError:
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+    return row
 
 
 def parse_all():
-    records = []
-    for lf in sorted(LOG_DIR.glob('*.jsonl')):
-        events = []
-        with open(lf) as f:
-            for line in f:
-                if line.strip():
-                    try: events.append(json.loads(line))
-                    except: pass
-        if not events:
-            continue
-
-        cat, issue, iter_num = classify(lf.stem)
-        first_ts = events[0].get('ts', 0)
-        last_ts = events[-1].get('ts', 0)
-
-        cost = 0.0
-        num_turns = 0
-        duration_ms = 0
-        model = events[0].get('model', 'unknown') if events[0].get('event') == 'start' else 'unknown'
-        is_error = False
-
-        for e in events:
-            if e.get('event') == 'result':
-                cost = e.get('cost_usd', 0) or 0
-                num_turns = e.get('num_turns', 0) or 0
-                duration_ms = e.get('duration_ms', 0) or 0
-            if e.get('event') == 'end':
-                is_error = e.get('is_error', False)
-
-        tool_calls = 0
-        text_chars = 0
-        text_blocks = 0
-        for e in events:
-            if e.get('event') == 'assistant':
-                for c in e.get('content', []):
-                    if isinstance(c, dict):
-                        if c.get('type') == 'tool_use':
-                            tool_calls += 1
-                        if c.get('type') == 'text':
-                            text_chars += len(c.get('text', ''))
-                            text_blocks += 1
-
-        # Estimate tokens from cost (Sonnet pricing: $3/M input, $15/M output)
-        # Assume ~80% input, 20% output by cost
-        # input_cost + output_cost = total_cost
-        # input_tokens * 3/1M + output_tokens * 15/1M = cost
-        # Rough: output_tokens ≈ text_chars/4, then input_tokens from remainder
-        est_output_tokens = text_chars / 4 if text_chars else 0
-        est_output_cost = est_output_tokens * 15 / 1_000_000
-        est_input_cost = max(0, cost - est_output_cost)
-        est_input_tokens = est_input_cost * 1_000_000 / 3 if est_input_cost > 0 else 0
-
-        records.append({
-            'file': lf.name,
-            'category': cat,
-            'issue': issue,
-            'iter': iter_num,
-            'start_ts': first_ts,
-            'end_ts': last_ts,
-            'duration_s': last_ts - first_ts,
-            'duration_ms': duration_ms,
-            'cost': cost,
-            'num_turns': num_turns,
-            'tool_calls': tool_calls,
-            'text_chars': text_chars,
-            'text_blocks': text_blocks,
-            'est_input_tokens': est_input_tokens,
-            'est_output_tokens': est_output_tokens,
-            'model': model,
-            'is_error': is_error,
-        })
-
-    return records
+    files = sorted(LOG_DIR.glob('*.jsonl'))
+    if len(files) < PARALLEL_MIN_FILES:
+        parsed = map(_parse_one, files)
+    else:
+        # Files are independent and parsing is pure CPU, so fan out across
+        # processes; a few chunks per worker keeps the load balanced.
+        with ProcessPoolExecutor() as ex:
+            chunksize = max(1, len(files) // (4 * (os.cpu_count() or 1)))
+            parsed = list(ex.map(_parse_one, files, chunksize=chunksize))
+    rows = [r for r in parsed if r is not None]
+
+    # Transpose the rows into typed columns rather than keeping a dict per
+    # agent execution.
+    columns = zip(*rows) if rows else [()] * len(PARSED_FIELDS)
+    arrays = {name: np.array(col, dtype=dt) for col, (name, dt) in zip(columns, PARSED_FIELDS)}
+
+    # Estimate tokens from cost (Sonnet pricing: $3/M input, $15/M output)
+    # Assume ~80% input, 20% output by cost
+    # input_cost + output_cost = total_cost
+    # input_tokens * 3/1M + output_tokens * 15/1M = cost
+    # Rough: output_tokens ≈ text_chars/4, then input_tokens from remainder
+    est_output_tokens = arrays['text_chars'] / 4
+    est_output_cost = est_output_tokens * 15 / 1_000_000
+    est_input_cost = np.maximum(0, arrays['cost'] - est_output_cost)
+    arrays['est_output_tokens'] = est_output_tokens
+    arrays['est_input_tokens'] = est_input_cost * 1_000_000 / 3
+
+    # The typed columns go straight into the DataFrame the notebook loads.
+    return pd.DataFrame({name: arrays[name] for name, _ in RECORD_FIELDS})
 
 
 # ---------------------------------------------------------------------------
 # Build notebook
 # ---------------------------------------------------------------------------
-def build_notebook(records):
-    nb = nbformat.v4.new_notebook()
-    data_json = json.dumps(records, indent=2)
+def _feather_b64(df):
+    # iter mixes ints, hex strings and None, which Arrow cannot store in one
+    # column; keep it as text and let the notebook restore the numeric ones.
+    iter_text = [None if v is None else str(v) for v in df['iter']]
+    buf = io.BytesIO()
+    df.assign(iter=iter_text).to_feather(buf, compression='zstd')
+    return base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+_NEW_CELL = {
+    'markdown': nbformat.v4.new_markdown_cell,
+    'code': nbformat.v4.new_code_cell,
+}
+
+
+def _notebook_cells(data_b64=None, chart_dir='charts', show_charts=True):
+    # Returns (cell_type, source) pairs. Without data_b64 the data cell is left
+    # out and the code cells expect a prepared df in their namespace (see
+    # render_charts).
+    cells = []
 
     def md(src):
-        nb.cells.append(nbformat.v4.new_markdown_cell(src))
+        cells.append(('markdown', src))
 
     def code(src):
-        nb.cells.append(nbformat.v4.new_code_cell(src))
+        cells.append(('code', src))
 
     # ── Title ──
     md("""# Autonomous SWE Pipeline — Execution Intelligence
@@ -152,12 +330,30 @@ def build_notebook(records):
 
 Each visualization answers a specific question about pipeline behavior.""")
 
-    # ── Data + Setup ──
-    code(f"""import json
+    # ── Data ──
+    if data_b64 is not None:
+        code(f"""import base64
+import io
+import pandas as pd
+
+# Embedded data (zstd-compressed Feather, base64-encoded)
+df = pd.read_feather(io.BytesIO(base64.b64decode('{data_b64}')))
+# iter is stored as text; coder, merger and integration iterations are numbers
+numeric_iter = df['category'].isin(['coder', 'merger', 'integration_tester'])
+df['iter'] = df['iter'].astype(object)
+df.loc[numeric_iter, 'iter'] = df.loc[numeric_iter, 'iter'].astype(int)
+""")
+
+    # ── Setup ──
+    code(f"""import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import Rectangle
 import seaborn as sns
 import squarify
 from datetime import datetime
@@ -165,9 +361,13 @@ from collections import defaultdict
 import warnings
 warnings.filterwarnings('ignore')
 
-# Embedded data
-records = json.loads('''{data_json}''')
-df = pd.DataFrame(records)
+# Charts are written to CHART_DIR and, in a notebook, shown inline
+CHART_DIR = {chart_dir!r}
+SHOW_CHARTS = {show_charts!r}
+
+# Low-cardinality labels as categoricals: groupby/isin work on integer codes
+for col in ('category', 'model', 'issue'):
+    df[col] = df[col].astype('category')
 
 # Derived columns
 df['duration_min'] = df['duration_s'] / 60
@@ -175,10 +375,15 @@ df['est_total_tokens'] = df['est_input_tokens'] + df['est_output_tokens']
 df['cost_per_min'] = df['cost'] / df['duration_min'].replace(0, np.nan)
 df['tools_per_turn'] = df['tool_calls'] / df['num_turns'].replace(0, np.nan)
 
-# Pipeline start reference
-t0 = df['start_ts'].min()
-df['start_offset_min'] = (df['start_ts'] - t0) / 60
-df['end_offset_min'] = (df['end_ts'] - t0) / 60
+# Pipeline wall-clock bounds, shared by every chart and summary
+GLOBAL_START_TS = df['start_ts'].min()
+GLOBAL_END_TS = df['end_ts'].max()
+GLOBAL_WALL_MIN = (GLOBAL_END_TS - GLOBAL_START_TS) / 60
+t0 = GLOBAL_START_TS
+# Epoch seconds need float64, but offsets of a few hours fit float32 to well
+# under a millisecond, halving the columns every timeline chart scans
+df['start_offset_min'] = ((df['start_ts'] - t0) / 60).astype('float32')
+df['end_offset_min'] = ((df['end_ts'] - t0) / 60).astype('float32')
 
 # Nice category labels
 CAT_LABELS = {{
@@ -192,7 +397,26 @@ CAT_LABELS = {{
     'integration_tester': 'Integration Test',
     'workspace': 'Workspace Ops',
 }}
-df['cat_label'] = df['category'].map(CAT_LABELS).fillna(df['category'])
+df['cat_label'] = df['category'].cat.rename_categories(
+    {{k: CAT_LABELS.get(k, k) for k in df['category'].cat.categories}})
+
+# Per-category aggregates, computed once and shared by the charts and summary
+STAGE_ORDER = ['planning', 'issue_writer', 'coder', 'reviewer', 'qa',
+               'synthesizer', 'merger', 'integration_tester']
+stage_stats = df.groupby('category', sort=False, observed=True).agg(
+    count=('file', 'count'),
+    total_cost=('cost', 'sum'),
+    total_min=('duration_min', 'sum'),
+    avg_cost=('cost', 'mean'),
+    avg_min=('duration_min', 'mean'),
+    total_turns=('num_turns', 'sum'),
+    total_tools=('tool_calls', 'sum'),
+    start=('start_offset_min', 'min'),
+    end=('end_offset_min', 'max'),
+)
+stage_stats['label'] = [CAT_LABELS.get(c, c) for c in stage_stats.index]
+# Stages in pipeline order, skipping any that never ran
+stages_run = [s for s in STAGE_ORDER if s in stage_stats.index]
 
 # Color map — warm = expensive, cool = cheap
 CAT_PALETTE = {{
@@ -207,18 +431,45 @@ CAT_PALETTE = {{
     'Synthesis': '#BDC3C7',
 }}
 
+# Colour per display label, resolved once for every category present
+CAT_COLORS = df['cat_label'].cat.categories.to_series().map(CAT_PALETTE).fillna('#95A5A6')
+
 # Global style
 sns.set_theme(style='whitegrid', font_scale=1.1)
 plt.rcParams['figure.dpi'] = 150
 plt.rcParams['savefig.dpi'] = 150
 plt.rcParams['font.family'] = 'sans-serif'
-
-import os
-os.makedirs('charts', exist_ok=True)
+# Open top/right frame for every chart, instead of despining each one
+plt.rcParams['axes.spines.top'] = False
+plt.rcParams['axes.spines.right'] = False
+
+# One Figure with a persistent Agg canvas is reused by every chart, so the
+# canvas and renderer are set up once rather than per chart
+_FIG = Figure()
+FigureCanvasAgg(_FIG)
+
+def _axes(nrows=1, ncols=1, *, figsize):
+    # Clear the shared figure, resize it and return fresh axes
+    _FIG.clf()
+    _FIG.set_size_inches(figsize)
+    return _FIG.subplots(nrows, ncols)
+
+def _save_chart(name):
+    # Write the chart once and show that PNG rather than rendering it again
+    path = os.path.join(CHART_DIR, f'{{name}}.png')
+    _FIG.savefig(path, bbox_inches='tight', facecolor='white')
+    # Drop the artists now, as plt.close would, rather than holding them and
+    # the data they reference until the next chart clears the figure
+    _FIG.clf()
+    if SHOW_CHARTS:
+        from IPython.display import Image, display
+        display(Image(filename=path))
+
+os.makedirs(CHART_DIR, exist_ok=True)
 
 print(f"Loaded {{len(df)}} agent executions across {{df['category'].nunique()}} categories")
 print(f"Total pipeline cost: ${{df['cost'].sum():.2f}}")
-print(f"Total wall time: {{(df['end_ts'].max() - df['start_ts'].min()) / 60:.1f}} minutes")
+print(f"Total wall time: {{GLOBAL_WALL_MIN:.1f}} minutes")
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -229,14 +480,15 @@ print(f"Total wall time: {{(df['end_ts'].max() - df['start_ts'].min()) / 60:.1f}
 A treemap reveals **proportional cost allocation** at a glance. Larger rectangles = more spend. This immediately shows whether the system is spending on *thinking* (planning) or *doing* (coding/QA).""")
 
     code("""# Treemap: cost allocation by category
-cat_cost = df.groupby('cat_label')['cost'].sum().sort_values(ascending=False)
+cat_cost = df.groupby('cat_label', sort=False, observed=True)['cost'].sum().sort_values(ascending=False)
 cat_cost = cat_cost[cat_cost > 0]
+total = cat_cost.sum()
 
-labels = [f"{cat}\\n${cost:.2f}\\n({cost/cat_cost.sum()*100:.0f}%)"
+labels = [f"{cat}\\n${cost:.2f}\\n({cost/total*100:.0f}%)"
           for cat, cost in cat_cost.items()]
-colors = [CAT_PALETTE.get(cat, '#95A5A6') for cat in cat_cost.index]
+colors = CAT_COLORS.loc[cat_cost.index].to_numpy()
 
-fig, ax = plt.subplots(figsize=(14, 8))
+ax = _axes(figsize=(14, 8))
 squarify.plot(sizes=cat_cost.values, label=labels, color=colors,
               alpha=0.85, edgecolor='white', linewidth=3, text_kwargs={'fontsize': 11, 'fontweight': 'bold'}, ax=ax)
 ax.set_title('Pipeline Cost Allocation — Where Does the Money Go?',
@@ -244,12 +496,10 @@ ax.set_title('Pipeline Cost Allocation — Where Does the Money Go?',
 ax.axis('off')
 
 # Annotation
-total = cat_cost.sum()
 ax.text(0.99, -0.02, f'Total pipeline cost: ${total:.2f}',
         transform=ax.transAxes, ha='right', fontsize=11, color='#666')
-plt.tight_layout()
-plt.savefig('charts/01_cost_treemap.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('01_cost_treemap')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -260,26 +510,25 @@ plt.show()
 Same treemap view, but for **cumulative agent-minutes**. Compare with cost treemap — are we paying proportionally for time, or are some phases disproportionately expensive?""")
 
     code("""# Treemap: time allocation by category
-cat_time = df.groupby('cat_label')['duration_min'].sum().sort_values(ascending=False)
+cat_time = df.groupby('cat_label', sort=False, observed=True)['duration_min'].sum().sort_values(ascending=False)
 cat_time = cat_time[cat_time > 0]
+total_min = cat_time.sum()
 
-labels = [f"{cat}\\n{dur:.1f} min\\n({dur/cat_time.sum()*100:.0f}%)"
+labels = [f"{cat}\\n{dur:.1f} min\\n({dur/total_min*100:.0f}%)"
           for cat, dur in cat_time.items()]
-colors = [CAT_PALETTE.get(cat, '#95A5A6') for cat in cat_time.index]
+colors = CAT_COLORS.loc[cat_time.index].to_numpy()
 
-fig, ax = plt.subplots(figsize=(14, 8))
+ax = _axes(figsize=(14, 8))
 squarify.plot(sizes=cat_time.values, label=labels, color=colors,
               alpha=0.85, edgecolor='white', linewidth=3, text_kwargs={'fontsize': 11, 'fontweight': 'bold'}, ax=ax)
 ax.set_title('Pipeline Time Allocation — Where Does the Time Go?',
              fontsize=16, fontweight='bold', pad=20)
 ax.axis('off')
 
-total_min = cat_time.sum()
-ax.text(0.99, -0.02, f'Total agent-minutes: {total_min:.0f} min (wall time: {(df["end_ts"].max() - df["start_ts"].min())/60:.0f} min)',
+ax.text(0.99, -0.02, f'Total agent-minutes: {total_min:.0f} min (wall time: {GLOBAL_WALL_MIN:.0f} min)',
         transform=ax.transAxes, ha='right', fontsize=11, color='#666')
-plt.tight_layout()
-plt.savefig('charts/02_time_treemap.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('02_time_treemap')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -289,7 +538,7 @@ plt.show()
 
 Bubble chart: each bubble is an agent category. X = total time, Y = total cost, size = number of agents. The **slope** of each point from the origin reveals cost-per-minute. Points above the diagonal are expensive per minute; below are cheap.""")
 
-    code("""cat_agg = df.groupby('cat_label').agg(
+    code("""cat_agg = df.groupby('cat_label', observed=True).agg(
     total_cost=('cost', 'sum'),
     total_min=('duration_min', 'sum'),
     count=('file', 'count'),
@@ -297,7 +546,7 @@ Bubble chart: each bubble is an agent category. X = total time, Y = total cost,
 ).reset_index()
 cat_agg = cat_agg[cat_agg['total_cost'] > 0]
 
-fig, ax = plt.subplots(figsize=(12, 8))
+ax = _axes(figsize=(12, 8))
 
 for _, row in cat_agg.iterrows():
     color = CAT_PALETTE.get(row['cat_label'], '#95A5A6')
@@ -321,10 +570,8 @@ ax.set_title('Cost Efficiency by Category — Bubble Size = Agent Count',
              fontsize=14, fontweight='bold')
 ax.set_xlim(0, None)
 ax.set_ylim(0, None)
-sns.despine()
-plt.tight_layout()
-plt.savefig('charts/03_cost_efficiency_bubble.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('03_cost_efficiency_bubble')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -334,32 +581,31 @@ plt.show()
 
 Cumulative cost plotted against wall-clock time. Steep slopes = expensive parallel work. Flat regions = sequential bottleneck or cheap operations. This reveals the **economic rhythm** of the pipeline.""")
 
-    code("""# Build timeline of cost events
-events = []
-for _, row in df.iterrows():
-    if row['cost'] > 0:
-        events.append((row['start_offset_min'], 0, row['cat_label']))  # start
-        events.append((row['end_offset_min'], row['cost'], row['cat_label']))  # cost realized at end
+    code("""# Build timeline of cost events: each paid execution contributes a start
+# (no cost yet) and an end (cost realized), interleaved per execution so a
+# stable sort orders simultaneous events exactly as appending them would
+paid = df['cost'].to_numpy() > 0
+cost = df['cost'].to_numpy()[paid]
+event_t = np.column_stack([df['start_offset_min'].to_numpy()[paid],
+                           df['end_offset_min'].to_numpy()[paid]]).ravel()
+event_c = np.column_stack([np.zeros_like(cost), cost]).ravel()
 
 # Sort by time, accumulate
-events.sort(key=lambda x: x[0])
-times = []
-cumcost = []
-running = 0
-for t, c, _ in events:
-    running += c
-    times.append(t)
-    cumcost.append(running)
-
-fig, ax = plt.subplots(figsize=(14, 6))
+order = np.argsort(event_t, kind='stable')
+times = event_t[order]
+cumcost = np.cumsum(event_c[order])
+running = cumcost[-1] if len(cumcost) else 0
+
+ax = _axes(figsize=(14, 6))
 ax.fill_between(times, cumcost, alpha=0.15, color='#E74C3C')
 ax.plot(times, cumcost, color='#E74C3C', linewidth=2.5, zorder=3)
 
-# Mark phases
+# Mark phases at each category's first start
+first_start = stage_stats['start']
 phase_markers = [
     ('Planning', 0, '#1ABC9C'),
-    ('Issue Writing', df[df['category']=='issue_writer']['start_offset_min'].min() if len(df[df['category']=='issue_writer']) > 0 else 0, '#3498DB'),
-    ('Coding Begins', df[df['category']=='coder']['start_offset_min'].min() if len(df[df['category']=='coder']) > 0 else 0, '#E74C3C'),
+    ('Issue Writing', first_start.get('issue_writer', 0), '#3498DB'),
+    ('Coding Begins', first_start.get('coder', 0), '#E74C3C'),
 ]
 for label, t, color in phase_markers:
     if t > 0:
@@ -370,10 +616,8 @@ ax.set_xlabel('Wall-Clock Time (minutes)', fontsize=12)
 ax.set_ylabel('Cumulative Cost ($)', fontsize=12)
 ax.set_title('Pipeline Burn Rate — Cumulative Cost Over Time', fontsize=14, fontweight='bold')
 ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('$%.0f'))
-sns.despine()
-plt.tight_layout()
-plt.savefig('charts/04_burn_rate.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('04_burn_rate')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -383,27 +627,21 @@ plt.show()
 
 A step plot showing concurrent agent count over wall-clock time. Peaks reveal where the pipeline exploits parallelism. Valleys reveal sequential bottlenecks. The **area under the curve** is total agent-minutes.""")
 
-    code("""# Build start/end events
-timeline = []
-for _, row in df.iterrows():
-    timeline.append((row['start_offset_min'], +1, row['cat_label']))
-    timeline.append((row['end_offset_min'], -1, row['cat_label']))
-timeline.sort(key=lambda x: x[0])
-
-times = []
-concurrency = []
-current = 0
-for t, delta, _ in timeline:
-    current += delta
-    times.append(t)
-    concurrency.append(current)
-
-fig, ax = plt.subplots(figsize=(14, 5))
+    code("""# Build start/end events, interleaved per agent so the stable sort
+# breaks ties the same way as appending (start, end) row by row
+event_t = np.column_stack([df['start_offset_min'], df['end_offset_min']]).ravel()
+event_d = np.tile(np.array([1, -1], dtype=np.int8), len(df))
+order = np.argsort(event_t, kind='stable')
+times = event_t[order]
+# The sweep itself is one compiled cumsum; int8 deltas keep the gather small
+concurrency = np.cumsum(event_d[order], dtype=np.int32)
+
+ax = _axes(figsize=(14, 5))
 ax.fill_between(times, concurrency, step='post', alpha=0.3, color='#3498DB')
 ax.step(times, concurrency, where='post', color='#2C3E50', linewidth=1.5)
 
-peak = max(concurrency)
-peak_t = times[concurrency.index(peak)]
+peak = concurrency.max()
+peak_t = times[concurrency.argmax()]
 ax.annotate(f'Peak: {peak} concurrent agents',
             xy=(peak_t, peak), xytext=(peak_t + 5, peak + 1),
             arrowprops=dict(arrowstyle='->', color='#E74C3C'),
@@ -413,10 +651,8 @@ ax.set_xlabel('Wall-Clock Time (minutes)', fontsize=12)
 ax.set_ylabel('Concurrent Agents', fontsize=12)
 ax.set_title('Pipeline Parallelism Over Time', fontsize=14, fontweight='bold')
 ax.set_ylim(0, None)
-sns.despine()
-plt.tight_layout()
-plt.savefig('charts/05_parallelism.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('05_parallelism')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -431,7 +667,8 @@ coding_cats = ['coder', 'reviewer', 'qa', 'synthesizer']
 coding_df = df[df['category'].isin(coding_cats)].copy()
 
 # Extract base issue name (remove iter suffixes for grouping)
-issue_phase = coding_df.groupby(['issue', 'category'])['duration_min'].sum().unstack(fill_value=0)
+issue_phase = coding_df.pivot_table(index='issue', columns='category', values='duration_min',
+                                    aggfunc='sum', fill_value=0, observed=True, sort=False)
 
 # Reorder columns
 col_order = [c for c in ['coder', 'reviewer', 'qa', 'synthesizer'] if c in issue_phase.columns]
@@ -441,20 +678,17 @@ issue_phase = issue_phase[col_order]
 issue_phase.columns = [c.title() for c in issue_phase.columns]
 
 # Sort by total time
-issue_phase['_total'] = issue_phase.sum(axis=1)
-issue_phase = issue_phase.sort_values('_total', ascending=True)
-issue_phase = issue_phase.drop('_total', axis=1)
+issue_phase = issue_phase.loc[issue_phase.sum(axis=1).sort_values().index]
 
-fig, ax = plt.subplots(figsize=(10, max(8, len(issue_phase) * 0.5)))
+ax = _axes(figsize=(10, max(8, len(issue_phase) * 0.5)))
 sns.heatmap(issue_phase, annot=True, fmt='.1f', cmap='YlOrRd',
             linewidths=1, linecolor='white', cbar_kws={'label': 'Minutes'},
             ax=ax)
 ax.set_title('Time Spent per Issue × Phase (minutes)', fontsize=14, fontweight='bold')
 ax.set_xlabel('Pipeline Phase', fontsize=12)
 ax.set_ylabel('')
-plt.tight_layout()
-plt.savefig('charts/06_issue_phase_heatmap.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('06_issue_phase_heatmap')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -465,25 +699,23 @@ plt.show()
 Same structure as above, but showing **cost** instead of time. Differences between time and cost heatmaps reveal which phases are expensive per minute.""")
 
     code("""# Build issue × phase cost matrix
-issue_cost = coding_df.groupby(['issue', 'category'])['cost'].sum().unstack(fill_value=0)
+issue_cost = coding_df.pivot_table(index='issue', columns='category', values='cost',
+                                   aggfunc='sum', fill_value=0, observed=True, sort=False)
 col_order = [c for c in ['coder', 'reviewer', 'qa', 'synthesizer'] if c in issue_cost.columns]
 issue_cost = issue_cost[col_order]
 issue_cost.columns = [c.title() for c in issue_cost.columns]
 
-issue_cost['_total'] = issue_cost.sum(axis=1)
-issue_cost = issue_cost.sort_values('_total', ascending=True)
-issue_cost = issue_cost.drop('_total', axis=1)
+issue_cost = issue_cost.loc[issue_cost.sum(axis=1).sort_values().index]
 
-fig, ax = plt.subplots(figsize=(10, max(8, len(issue_cost) * 0.5)))
-sns.heatmap(issue_cost, annot=True, fmt='$.2f', cmap='YlOrRd',
+ax = _axes(figsize=(10, max(8, len(issue_cost) * 0.5)))
+sns.heatmap(issue_cost, annot=True, fmt='.2f', cmap='YlOrRd',
             linewidths=1, linecolor='white', cbar_kws={'label': 'Cost ($)'},
             ax=ax)
 ax.set_title('Cost per Issue × Phase ($)', fontsize=14, fontweight='bold')
 ax.set_xlabel('Pipeline Phase', fontsize=12)
 ax.set_ylabel('')
-plt.tight_layout()
-plt.savefig('charts/07_issue_cost_heatmap.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('07_issue_cost_heatmap')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -497,7 +729,7 @@ Violin plots show the **full distribution** of durations within each pipeline ph
                'Branch Merging', 'Integration Test', 'Synthesis', 'Workspace Ops']
 phase_df = df[df['cat_label'].isin(phase_order)].copy()
 
-fig, ax = plt.subplots(figsize=(14, 7))
+ax = _axes(figsize=(14, 7))
 order = [p for p in phase_order if p in phase_df['cat_label'].values]
 palette = {k: CAT_PALETTE.get(k, '#95A5A6') for k in order}
 
@@ -511,10 +743,8 @@ sns.stripplot(data=phase_df, y='cat_label', x='duration_min', order=order,
 ax.set_xlabel('Duration (minutes)', fontsize=12)
 ax.set_ylabel('')
 ax.set_title('Duration Distribution by Pipeline Phase', fontsize=14, fontweight='bold')
-sns.despine()
-plt.tight_layout()
-plt.savefig('charts/08_phase_duration_violin.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('08_phase_duration_violin')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -526,7 +756,7 @@ Tool calls are a proxy for **actions taken** (file edits, command runs, searches
 
     code("""work_df = df[df['tool_calls'] > 0].copy()
 
-fig, ax = plt.subplots(figsize=(14, 8))
+ax = _axes(figsize=(14, 8))
 for cat in work_df['cat_label'].unique():
     subset = work_df[work_df['cat_label'] == cat]
     color = CAT_PALETTE.get(cat, '#95A5A6')
@@ -544,10 +774,8 @@ ax.set_title('Agent Effort — Turns vs Tool Calls (bubble size = cost)',
 max_val = max(work_df['num_turns'].max(), work_df['tool_calls'].max())
 ax.plot([0, max_val], [0, max_val], '--', color='#ccc', alpha=0.5, zorder=1, label='1 tool/turn')
 ax.legend(fontsize=9, loc='upper left', ncol=2)
-sns.despine()
-plt.tight_layout()
-plt.savefig('charts/09_agent_effort.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('09_agent_effort')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -559,7 +787,7 @@ For issues that required multiple coding iterations: how much extra time and mon
 
     code("""# Find issues with multiple coder iterations
 coder_df = df[df['category'] == 'coder'].copy()
-iter_counts = coder_df.groupby('issue')['iter'].max()
+iter_counts = coder_df.groupby('issue', observed=True)['iter'].max()
 multi = iter_counts[iter_counts > 1]
 
 if len(multi) > 0:
@@ -587,7 +815,7 @@ if len(multi) > 0:
 
     rw = pd.DataFrame(rework_data)
 
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+    ax1, ax2 = _axes(1, 2, figsize=(14, 5))
 
     # Cost comparison
     x = range(len(rw))
@@ -606,11 +834,10 @@ if len(multi) > 0:
     ax2.set_title('Time: First Attempt vs Rework')
     ax2.legend()
 
-    plt.suptitle('The Cost of Rework — QA Failures Trigger Extra Iterations',
+    _FIG.suptitle('The Cost of Rework — QA Failures Trigger Extra Iterations',
                  fontsize=14, fontweight='bold', y=1.02)
-    plt.tight_layout()
-    plt.savefig('charts/10_rework_penalty.png', bbox_inches='tight', facecolor='white')
-    plt.show()
+    _FIG.tight_layout()
+    _save_chart('10_rework_penalty')
 else:
     print("No multi-iteration issues found — all issues passed QA on first try!")
 """)
@@ -622,34 +849,20 @@ else:
 
 A waterfall showing how the pipeline progresses through stages. Each bar shows a stage's wall-clock span (from first agent start to last agent end in that stage). Overlapping bars reveal parallelism between stages.""")
 
-    code("""# Compute wall-clock span per category
-stage_order = ['planning', 'issue_writer', 'coder', 'reviewer', 'qa',
-               'synthesizer', 'merger', 'integration_tester']
-stage_spans = []
-for stage in stage_order:
-    sdf = df[df['category'] == stage]
-    if len(sdf) == 0:
-        continue
-    stage_spans.append({
-        'stage': CAT_LABELS.get(stage, stage),
-        'start': sdf['start_offset_min'].min(),
-        'end': sdf['end_offset_min'].max(),
-        'duration': sdf['end_offset_min'].max() - sdf['start_offset_min'].min(),
-        'agent_count': len(sdf),
-        'total_cost': sdf['cost'].sum(),
-    })
-
-spans = pd.DataFrame(stage_spans)
-
-fig, ax = plt.subplots(figsize=(14, 6))
-colors = [CAT_PALETTE.get(s, '#95A5A6') for s in spans['stage']]
+    code("""# Wall-clock span per category
+spans = stage_stats.loc[stages_run, ['label', 'start', 'end', 'count', 'total_cost']].reset_index()
+spans['duration'] = spans['end'] - spans['start']
+spans = spans.rename(columns={'label': 'stage'})
+
+ax = _axes(figsize=(14, 6))
+colors = CAT_COLORS.loc[spans['stage']].to_numpy()
 bars = ax.barh(range(len(spans)), spans['duration'],
                left=spans['start'], color=colors, alpha=0.8,
                edgecolor='white', linewidth=2, height=0.6)
 
 for i, row in spans.iterrows():
     ax.text(row['end'] + 0.5, i,
-            f"{row['duration']:.0f} min · {row['agent_count']} agents · ${row['total_cost']:.1f}",
+            f"{row['duration']:.0f} min · {row['count']} agents · ${row['total_cost']:.1f}",
             va='center', fontsize=9, color='#555')
 
 ax.set_yticks(range(len(spans)))
@@ -658,10 +871,8 @@ ax.set_xlabel('Wall-Clock Time (minutes from start)', fontsize=12)
 ax.set_title('Pipeline Stage Spans — When Does Each Phase Run?',
              fontsize=14, fontweight='bold')
 ax.invert_yaxis()
-sns.despine()
-plt.tight_layout()
-plt.savefig('charts/11_pipeline_flow.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('11_pipeline_flow')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -675,12 +886,12 @@ Each issue ranked by total cost, broken down by pipeline phase. This immediately
 issue_cost_df = df[df['category'].isin(coding_cats)].copy()
 
 # Pivot
-pivot = issue_cost_df.groupby(['issue', 'cat_label'])['cost'].sum().unstack(fill_value=0)
-pivot['_total'] = pivot.sum(axis=1)
-pivot = pivot.sort_values('_total', ascending=True)
-total_col = pivot.pop('_total')
+pivot = issue_cost_df.pivot_table(index='issue', columns='cat_label', values='cost',
+                                  aggfunc='sum', fill_value=0, observed=True, sort=False)
+total_col = pivot.sum(axis=1).sort_values()
+pivot = pivot.loc[total_col.index]
 
-fig, ax = plt.subplots(figsize=(12, max(6, len(pivot) * 0.45)))
+ax = _axes(figsize=(12, max(6, len(pivot) * 0.45)))
 
 phase_colors = {'Coding': '#E74C3C', 'Code Review': '#F1C40F',
                 'QA Testing': '#E67E22', 'Synthesis': '#BDC3C7'}
@@ -702,10 +913,8 @@ ax.set_yticklabels(pivot.index, fontsize=10)
 ax.set_xlabel('Cost ($)', fontsize=12)
 ax.set_title('Issue Cost Ranking with Phase Breakdown', fontsize=14, fontweight='bold')
 ax.legend(loc='lower right', fontsize=9)
-sns.despine()
-plt.tight_layout()
-plt.savefig('charts/12_issue_cost_ranking.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('12_issue_cost_ranking')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -715,30 +924,22 @@ plt.show()
 
 Compares **total agent-minutes** (sum of all agent durations) vs **wall-clock minutes** per pipeline stage. The ratio reveals parallelism efficiency — a ratio of 15:1 for issue writers means 15 ran in parallel.""")
 
-    code("""stage_data = []
-for stage in ['planning', 'issue_writer', 'coder', 'reviewer', 'qa', 'synthesizer', 'merger', 'integration_tester']:
-    sdf = df[df['category'] == stage]
-    if len(sdf) == 0: continue
-    agent_min = sdf['duration_min'].sum()
-    wall_min = sdf['end_offset_min'].max() - sdf['start_offset_min'].min()
-    wall_min = max(wall_min, 0.1)  # avoid div by zero
-    stage_data.append({
-        'stage': CAT_LABELS.get(stage, stage),
-        'agent_min': agent_min,
-        'wall_min': wall_min,
-        'ratio': agent_min / wall_min,
-    })
-
-sdata = pd.DataFrame(stage_data).sort_values('ratio', ascending=True)
-
-fig, ax = plt.subplots(figsize=(12, 6))
-colors = [CAT_PALETTE.get(s, '#95A5A6') for s in sdata['stage']]
+    code("""sdata = stage_stats.loc[stages_run, ['label', 'total_min', 'start', 'end']].reset_index()
+sdata = sdata.rename(columns={'label': 'stage', 'total_min': 'agent_min'})
+sdata['wall_min'] = (sdata['end'] - sdata['start']).clip(lower=0.1)  # avoid div by zero
+sdata['ratio'] = sdata['agent_min'] / sdata['wall_min']
+sdata = sdata.sort_values('ratio', ascending=True)
+
+ax = _axes(figsize=(12, 6))
+colors = CAT_COLORS.loc[sdata['stage']].to_numpy()
 bars = ax.barh(sdata['stage'], sdata['ratio'], color=colors, alpha=0.85,
                edgecolor='white', height=0.6)
 
-for bar, ratio, agent_m, wall_m in zip(bars, sdata['ratio'], sdata['agent_min'], sdata['wall_min']):
-    ax.text(bar.get_width() + 0.1, bar.get_y() + bar.get_height()/2,
-            f'{ratio:.1f}x  ({agent_m:.0f} agent-min / {wall_m:.0f} wall-min)',
+bar_labels = (sdata['ratio'].map('{:.1f}x  ('.format)
+              + sdata['agent_min'].map('{:.0f} agent-min / '.format)
+              + sdata['wall_min'].map('{:.0f} wall-min)'.format))
+for bar, bar_label in zip(bars, bar_labels):
+    ax.text(bar.get_width() + 0.1, bar.get_y() + bar.get_height()/2, bar_label,
             va='center', fontsize=9)
 
 ax.axvline(1, color='#E74C3C', linestyle='--', alpha=0.5, label='No parallelism (1x)')
@@ -746,10 +947,8 @@ ax.set_xlabel('Parallelism Ratio (agent-minutes / wall-minutes)', fontsize=12)
 ax.set_title('Parallelism Efficiency — Higher = More Parallel',
              fontsize=14, fontweight='bold')
 ax.legend(fontsize=9)
-sns.despine()
-plt.tight_layout()
-plt.savefig('charts/13_parallelism_efficiency.png', bbox_inches='tight', facecolor='white')
-plt.show()
+_FIG.tight_layout()
+_save_chart('13_parallelism_efficiency')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -757,21 +956,31 @@ plt.show()
     # ══════════════════════════════════════════════════════════════════════
     md("""## 14. Executive Dashboard — Key Metrics at a Glance""")
 
-    code("""total_cost = df['cost'].sum()
-wall_min = (df['end_ts'].max() - df['start_ts'].min()) / 60
-agent_min = df['duration_min'].sum()
+    code("""kpi = df.agg({
+    'cost': 'sum',
+    'duration_min': 'sum',
+    'num_turns': 'sum',
+    'tool_calls': 'sum',
+})
+total_cost = kpi['cost']
+wall_min = GLOBAL_WALL_MIN
+agent_min = kpi['duration_min']
 total_agents = len(df)
-total_issues = df[df['category'] == 'coder']['issue'].nunique()
-total_turns = df['num_turns'].sum()
-total_tools = df['tool_calls'].sum()
+# The mixed-dtype result is float64; the counts are exact, so restore ints
+total_turns = int(kpi['num_turns'])
+total_tools = int(kpi['tool_calls'])
+coder = df.loc[df['category'] == 'coder', ['issue', 'iter']]
+
+# One group per issue a coder worked on, so its length is the issue count
+coder_max_iter = coder.groupby('issue', sort=False, observed=True)['iter'].max()
+total_issues = len(coder_max_iter)
 
 # Issues with multiple iterations
-coder_max_iter = df[df['category'] == 'coder'].groupby('issue')['iter'].max()
 rework_count = (coder_max_iter > 1).sum()
-first_pass_rate = (1 - rework_count / len(coder_max_iter)) * 100 if len(coder_max_iter) > 0 else 100
+first_pass_rate = (1 - rework_count / total_issues) * 100 if total_issues > 0 else 100
 
-fig, axes = plt.subplots(2, 4, figsize=(16, 6))
-fig.suptitle('Pipeline Execution Dashboard', fontsize=16, fontweight='bold', y=1.05)
+ax = _axes(figsize=(16, 6))
+_FIG.suptitle('Pipeline Execution Dashboard', fontsize=16, fontweight='bold', y=1.05)
 
 kpis = [
     ('Total Cost', f'${total_cost:.2f}', '#E74C3C'),
@@ -784,23 +993,26 @@ kpis = [
     ('LLM Turns', f'{total_turns:,}', '#F1C40F'),
 ]
 
-for ax, (label, value, color) in zip(axes.flat, kpis):
-    ax.text(0.5, 0.55, value, transform=ax.transAxes, ha='center', va='center',
+# One Axes over the whole figure, laid out as a 2 x 4 grid of KPI cells
+ax.set_xlim(0, 1)
+ax.set_ylim(0, 1)
+ax.axis('off')
+for i, (label, value, color) in enumerate(kpis):
+    x = (i % 4 + 0.5) / 4
+    y = (1 - i // 4) * 0.5  # bottom edge of the cell
+    ax.text(x, y + 0.275, value, ha='center', va='center',
             fontsize=24, fontweight='bold', color=color)
-    ax.text(0.5, 0.15, label, transform=ax.transAxes, ha='center', va='center',
+    ax.text(x, y + 0.075, label, ha='center', va='center',
             fontsize=11, color='#666')
-    ax.set_xlim(0, 1)
-    ax.set_ylim(0, 1)
-    ax.axis('off')
-    # Subtle border
-    for spine in ax.spines.values():
-        spine.set_visible(True)
-        spine.set_color('#eee')
-        spine.set_linewidth(2)
-
-plt.tight_layout()
-plt.savefig('charts/14_dashboard.png', bbox_inches='tight', facecolor='white')
-plt.show()
+
+# Subtle cell borders, drawn as one collection rather than per-cell spines
+ax.add_collection(PatchCollection(
+    [Rectangle((col / 4 + 0.01, row / 2 + 0.02), 0.23, 0.46)
+     for row in range(2) for col in range(4)],
+    facecolor='none', edgecolor='#eee', linewidth=2))
+
+_FIG.tight_layout()
+_save_chart('14_dashboard')
 """)
 
     # ══════════════════════════════════════════════════════════════════════
@@ -808,46 +1020,72 @@ plt.show()
     # ══════════════════════════════════════════════════════════════════════
     md("""## Summary Table""")
     code("""# Per-category summary
-cat_summary = df.groupby('cat_label').agg(
-    count=('file', 'count'),
-    total_cost=('cost', 'sum'),
-    total_min=('duration_min', 'sum'),
-    avg_cost=('cost', 'mean'),
-    avg_min=('duration_min', 'mean'),
-    total_turns=('num_turns', 'sum'),
-    total_tools=('tool_calls', 'sum'),
-).sort_values('total_cost', ascending=False)
+cat_summary = stage_stats[['count', 'total_cost', 'total_min', 'avg_cost', 'avg_min',
+                           'total_turns', 'total_tools']].copy()
+cat_summary.index = stage_stats['label']
+cat_summary = cat_summary.sort_values('total_cost', ascending=False)
+
+grand_cost = cat_summary['total_cost'].sum()
 
 print("\\n" + "="*90)
 print(f"  {'Category':<20} {'Agents':>6} {'Cost':>8} {'Time(min)':>10} {'Avg$/agent':>10} {'Turns':>7} {'Tools':>7}")
 print("="*90)
-for idx, row in cat_summary.iterrows():
-    print(f"  {idx:<20} {row['count']:>6.0f} ${row['total_cost']:>7.2f} {row['total_min']:>10.1f} "
-          f"${row['avg_cost']:>9.2f} {row['total_turns']:>7.0f} {row['total_tools']:>7.0f}")
-print(f"  {'TOTAL':<20} {cat_summary['count'].sum():>6.0f} ${cat_summary['total_cost'].sum():>7.2f} "
+# Format whole columns and join them, rather than one f-string per row
+rows = (cat_summary.index.to_series().astype(str).str.ljust(20)
+        + ' ' + cat_summary['count'].map('{:>6.0f}'.format)
+        + ' $' + cat_summary['total_cost'].map('{:>7.2f}'.format)
+        + ' ' + cat_summary['total_min'].map('{:>10.1f}'.format)
+        + ' $' + cat_summary['avg_cost'].map('{:>9.2f}'.format)
+        + ' ' + cat_summary['total_turns'].map('{:>7.0f}'.format)
+        + ' ' + cat_summary['total_tools'].map('{:>7.0f}'.format))
+print('\\n'.join('  ' + rows))
+print(f"  {'TOTAL':<20} {cat_summary['count'].sum():>6.0f} ${grand_cost:>7.2f} "
       f"{cat_summary['total_min'].sum():>10.1f}")
 
 # Key insights
 print("\\n\\nKEY INSIGHTS:")
-print(f"  • Coding is {cat_summary.loc['Coding','total_cost']/cat_summary['total_cost'].sum()*100:.0f}% of total cost")
-print(f"  • QA is {cat_summary.loc['QA Testing','total_cost']/cat_summary['total_cost'].sum()*100:.0f}% of total cost — significant quality investment")
+print(f"  • Coding is {cat_summary.loc['Coding','total_cost']/grand_cost*100:.0f}% of total cost")
+print(f"  • QA is {cat_summary.loc['QA Testing','total_cost']/grand_cost*100:.0f}% of total cost — significant quality investment")
 if 'Integration Test' in cat_summary.index:
-    print(f"  • Integration testing: {cat_summary.loc['Integration Test','total_cost']/cat_summary['total_cost'].sum()*100:.0f}% of cost")
-print(f"  • Planning is only {cat_summary.loc['Planning','total_cost']/cat_summary['total_cost'].sum()*100:.0f}% — cheap relative to execution")
-print(f"  • Parallelism ratio: {cat_summary['total_min'].sum() / ((df['end_ts'].max() - df['start_ts'].min()) / 60):.1f}x (agent-min / wall-min)")
+    print(f"  • Integration testing: {cat_summary.loc['Integration Test','total_cost']/grand_cost*100:.0f}% of cost")
+print(f"  • Planning is only {cat_summary.loc['Planning','total_cost']/grand_cost*100:.0f}% — cheap relative to execution")
+print(f"  • Parallelism ratio: {cat_summary['total_min'].sum() / GLOBAL_WALL_MIN:.1f}x (agent-min / wall-min)")
 """)
 
-    # Write notebook
+    return cells
+
+
+def build_notebook(df):
+    nb = nbformat.v4.new_notebook()
+    nb.cells = [_NEW_CELL[kind](src) for kind, src in _notebook_cells(_feather_b64(df))]
     with open(NB_PATH, 'w') as f:
         nbformat.write(nb, f)
     print(f"\nNotebook written to: {NB_PATH}")
 
 
+def render_charts(df):
+    # Run the notebook's code cells in this process, writing the PNGs to
+    # CHART_DIR without serialising the data or starting a kernel.
+    namespace = {'df': df.copy()}
+    for i, (kind, src) in enumerate(_notebook_cells(chart_dir=str(CHART_DIR), show_charts=False)):
+        if kind == 'code':
+            exec(compile(src, f'<notebook cell {i}>', 'exec'), namespace)
+    print(f"\nCharts written to: {CHART_DIR}")
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 if __name__ == '__main__':
-    records = parse_all()
-    print(f"Parsed {len(records)} agent executions")
-    build_notebook(records)
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--charts-only', action='store_true',
+                    help='render the chart PNGs in-process instead of writing the notebook')
+    args = ap.parse_args()
+
+    df = parse_all()
+    print(f"Parsed {len(df)} agent executions")
+    if args.charts_only:
+        render_charts(df)
+    else:
+        build_notebook(df)
     print("Done.")
@@ -10,12 +10,20 @@ a self-contained Jupyter notebook with matplotlib visualizations.
 
 import json
 import os
+import pickle
 import re
 import sys
-from collections import defaultdict
+try:
+    import orjson as _json_fast  # optional, several times faster on small objects
+except ImportError:
+    _json_fast = json
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from itertools import chain
 from pathlib import Path
 
+import numpy as np
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -27,23 +35,61 @@ NOTEBOOK_PATH = Path(
     "/Users/santoshkumarradha/Documents/agentfield/code/int-agentfield-examples/"
     "af-swe/example-diagrams/pipeline_analysis.ipynb"
 )
+# Per-log metrics cache, kept next to the generated notebook
+METRICS_CACHE_DIR = NOTEBOOK_PATH.parent / ".pipeline_cache"
+# Below this many log files a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 64
+# Log files are read in blocks of this many bytes
+READ_BLOCK_SIZE = 1 << 20
+# Bump when the metrics dict layout changes so stale cache entries are ignored
+METRICS_CACHE_VERSION = 1
+
+# Categories returned by classify_log, in a fixed order so each can be stored
+# as a small integer code
+CATEGORIES = (
+    "planning", "issue_writer", "coder", "reviewer", "qa", "synthesizer",
+    "merger", "integration_tester", "workspace_setup", "workspace_cleanup", "unknown",
+)
+CAT_ID = {c: i for i, c in enumerate(CATEGORIES)}
+# Per-issue pipeline phases: (category, issue_totals key)
+ISSUE_PHASES = (("coder", "coding"), ("reviewer", "review"), ("qa", "qa"), ("synthesizer", "synthesis"))
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
-def parse_log(filepath):
-    """Return list of parsed JSON events from a JSONL file."""
-    events = []
-    with open(filepath) as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                try:
-                    events.append(json.loads(line))
-                except json.JSONDecodeError:
-                    pass
-    return events
+def _decode_lines(lines):
+    """Yield the JSON value of each line, skipping blank and malformed ones."""
+    for line in lines:
+        if line.strip():
+            try:
+                yield _json_fast.loads(line)
+            except ValueError:
+                pass
+
+
+def iter_events(filepath):
+    """Yield parsed JSON events from a JSONL file, one line at a time."""
+    # Split lines out of large blocks in C rather than reading them one by
+    # one; the partial last line of each block is carried into the next.
+    with open(filepath, "rb") as f:
+        # Logs are read front to back once; let the kernel read further ahead
+        # so disk or network latency overlaps with decoding (Linux only)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        tail = b""
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b""):
+            lines = (tail + block).split(b"\n")
+            tail = lines.pop()
+            yield from _decode_lines(lines)
+    yield from _decode_lines((tail,))
+
+
+def dump_json(obj):
+    """Serialize obj as 2-space indented UTF-8 JSON bytes."""
+    if _json_fast is json:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+    return _json_fast.dumps(obj, option=_json_fast.OPT_INDENT_2 | _json_fast.OPT_NON_STR_KEYS)
 
 
 def ts_to_str(ts):
@@ -59,6 +105,87 @@ def fmt_duration(seconds):
     return f"{s}s"
 
 
+_RX_CODER = re.compile(r"coder_(.+)_iter_(\d+)")
+_RX_REVIEWER = re.compile(r"reviewer_(.+)_iter_([a-f0-9]+)")
+_RX_QA = re.compile(r"qa_(.+)_iter_([a-f0-9]+)")
+_RX_SYN = re.compile(r"synthesizer_(.+)_iter_([a-f0-9]+)")
+_RX_MERGER = re.compile(r"merger_level_(\d+)")
+_RX_INT = re.compile(r"integration_tester_level_(\d+)")
+_RX_WS = re.compile(r"workspace_(setup|cleanup)_level_(\d+)")
+
+# QA verdict detection, matched against lowercased assistant text. Phrases
+# that contain a shorter one ("all tests passed", "passed - all tests
+# successful") are covered by it and left out.
+_PASS_PHRASES = ("all tests pass", "passed - all", "result: passed", "result: all", "result: ok")
+_RX_FOUND_FAILURES = re.compile(r'(?:found|have|got|revealed)\s+\d+\s+test\s+failure')
+_RX_N_FAILED = re.compile(r'\d+\s+(?:tests?\s+)?(?:failed|failing)')
+_RX_FALSE_POSITIVE = re.compile(r'(?:write|create|artifact|report|empty|which will be)')
+
+
+_PLANNING_AGENTS = frozenset({"product_manager", "architect", "tech_lead", "sprint_planner"})
+_HEX_DIGITS = "0123456789abcdef"
+_WS_PREFIXES = ("setup_level_", "cleanup_level_")
+
+
+# Each parser gets the full stem and the text after its first "_". Well-formed
+# stems are split with str methods; anything unusual falls back to the regex
+# so results match it exactly. None means "not this category".
+def _iter_parser(category, rx, hex_iter):
+    def parse(stem, rest):
+        issue, _, it = rest.rpartition("_iter_")
+        if issue and it:
+            if hex_iter and not it.strip(_HEX_DIGITS):
+                return (category, issue, it)
+            if not hex_iter and it.isdecimal():
+                return (category, issue, int(it))
+        m = rx.match(stem)
+        if m:
+            return (category, m.group(1), m.group(2) if hex_iter else int(m.group(2)))
+        return None
+    return parse
+
+
+def _level_parser(category, rest_prefix, rx):
+    def parse(stem, rest):
+        level = rest[len(rest_prefix):]
+        if rest.startswith(rest_prefix) and level.isdecimal():
+            return (category, f"level_{level}", int(level))
+        m = rx.match(stem)
+        if m:
+            return (category, f"level_{m.group(1)}", int(m.group(1)))
+        return None
+    return parse
+
+
+def _parse_issue_writer(stem, rest):
+    if rest.startswith("writer_"):
+        return ("issue_writer", stem[len("issue_writer_"):], None)
+    return None
+
+
+def _parse_workspace(stem, rest):
+    if rest.startswith(_WS_PREFIXES):
+        kind, _, level = rest.partition("_level_")
+        if level.isdecimal():
+            return (f"workspace_{kind}", f"level_{level}", int(level))
+    m = _RX_WS.match(stem)
+    if m:
+        return (f"workspace_{m.group(1)}", f"level_{m.group(2)}", int(m.group(2)))
+    return None
+
+
+_PREFIX_PARSERS = {
+    "issue": _parse_issue_writer,
+    "coder": _iter_parser("coder", _RX_CODER, hex_iter=False),
+    "reviewer": _iter_parser("reviewer", _RX_REVIEWER, hex_iter=True),
+    "qa": _iter_parser("qa", _RX_QA, hex_iter=True),
+    "synthesizer": _iter_parser("synthesizer", _RX_SYN, hex_iter=True),
+    "merger": _level_parser("merger", "level_", _RX_MERGER),
+    "integration": _level_parser("integration_tester", "tester_level_", _RX_INT),
+    "workspace": _parse_workspace,
+}
+
+
 def classify_log(filename):
     """
     Classify a log file into a category and extract issue name + iteration info.
@@ -69,114 +196,164 @@ def classify_log(filename):
     stem = filename.replace(".jsonl", "")
 
     # Planning agents
-    if stem in ("product_manager", "architect", "tech_lead", "sprint_planner"):
+    if stem in _PLANNING_AGENTS:
         return ("planning", stem, None)
 
-    # Issue writers
-    if stem.startswith("issue_writer_"):
-        issue = stem[len("issue_writer_"):]
-        return ("issue_writer", issue, None)
-
-    # Coder
-    m = re.match(r"coder_(.+)_iter_(\d+)", stem)
-    if m:
-        return ("coder", m.group(1), int(m.group(2)))
-
-    # Reviewer
-    m = re.match(r"reviewer_(.+)_iter_([a-f0-9]+)", stem)
-    if m:
-        return ("reviewer", m.group(1), m.group(2))
-
-    # QA
-    m = re.match(r"qa_(.+)_iter_([a-f0-9]+)", stem)
-    if m:
-        return ("qa", m.group(1), m.group(2))
-
-    # Synthesizer
-    m = re.match(r"synthesizer_(.+)_iter_([a-f0-9]+)", stem)
-    if m:
-        return ("synthesizer", m.group(1), m.group(2))
+    # Every other category is picked by the stem's first "_"-separated token
+    head, _, rest = stem.partition("_")
+    parse = _PREFIX_PARSERS.get(head)
+    return (parse and parse(stem, rest)) or ("unknown", stem, None)
 
-    # Merger
-    m = re.match(r"merger_level_(\d+)", stem)
-    if m:
-        return ("merger", f"level_{m.group(1)}", int(m.group(1)))
 
-    # Integration tester
-    m = re.match(r"integration_tester_level_(\d+)", stem)
-    if m:
-        return ("integration_tester", f"level_{m.group(1)}", int(m.group(1)))
+def scan_qa_text(text, failures):
+    """
+    Check one QA assistant text block for a verdict.
+    Returns True if it reports that all tests passed. Any test failures it
+    describes are appended to `failures`.
+    """
+    txt = text.lower()
+    # Look for clear final verdicts (usually near end of QA)
+    passed = any(phrase in txt for phrase in _PASS_PHRASES)
+    # Both failure patterns need "fail", so most chunks skip the regexes
+    if "fail" not in txt:
+        return passed
+    # Detect actual test failures (not just mentions of writing a failures report)
+    # Only flag if the message indicates actual test failures found
+    if _RX_FOUND_FAILURES.search(txt):
+        snippet = text[:200].replace("\n", " ").strip()
+        failures.append(snippet)
+    elif _RX_N_FAILED.search(txt):
+        # Skip false positives like "write the test failure report" or "failures file (empty"
+        if not _RX_FALSE_POSITIVE.search(txt):
+            snippet = text[:200].replace("\n", " ").strip()
+            failures.append(snippet)
+    return passed
+
+
+def _summarize_file(logfile):
+    """
+    Summarize one log file in a single streaming pass and return its metrics
+    dict, or None if it has no events.
+    """
+    fname = logfile.name
+    category, issue, iter_info = classify_log(fname)
+    is_qa = category == "qa"
+
+    # The start event, when present, is always the first line
+    events = iter_events(logfile)
+    first_ev = next(events, None)
+    if first_ev is None:
+        return None
+
+    last_ev = first_ev
+    result_ev = None
+    end_ev = None
+    tool_calls = 0
+    turns = set()
+    # QA verdict: 'pass' once any text block reports it, else 'unknown'
+    qa_verdict = "unknown"
+    qa_failures = []
+
+    # result and end come last; keep the latest of each as the scan passes
+    for ev in chain((first_ev,), events):
+        last_ev = ev
+        kind = ev.get("event")
+        if kind == "assistant":
+            if "turn" in ev:
+                turns.add(ev["turn"])
+            content = ev.get("content", [])
+            if not isinstance(content, list):
+                continue
+            for c in content:
+                ctype = c.get("type")
+                if ctype == "tool_use":
+                    tool_calls += 1
+                elif ctype == "text" and is_qa and scan_qa_text(c["text"], qa_failures):
+                    qa_verdict = "pass"
+        elif kind == "result":
+            result_ev = ev
+        elif kind == "end":
+            end_ev = ev
+
+    # Extract basic metrics
+    first_ts = first_ev.get("ts", 0)
+    last_ts = last_ev.get("ts", 0)
+    duration_s = last_ts - first_ts
+
+    num_turns = 0
+    cost_usd = 0.0
+    duration_ms_reported = 0
+    is_error = False
+    model = "unknown"
+
+    if result_ev:
+        num_turns = result_ev.get("num_turns", 0)
+        cost_usd = result_ev.get("cost_usd", 0.0)
+        duration_ms_reported = result_ev.get("duration_ms", 0)
+    if end_ev:
+        is_error = end_ev.get("is_error", False)
+
+    # Get model from start event
+    if first_ev.get("event") == "start":
+        model = first_ev.get("model", "unknown")
+
+    metrics = {
+        "file": fname,
+        "category": category,
+        "issue": issue,
+        "iter": iter_info,
+        "first_ts": first_ts,
+        "last_ts": last_ts,
+        "duration_s": duration_s,
+        "duration_ms_reported": duration_ms_reported,
+        "num_turns": num_turns,
+        "assistant_turns": len(turns),
+        "tool_calls": tool_calls,
+        "cost_usd": cost_usd,
+        "is_error": is_error,
+        "model": model,
+    }
 
-    # Workspace setup/cleanup
-    m = re.match(r"workspace_(setup|cleanup)_level_(\d+)", stem)
-    if m:
-        return (f"workspace_{m.group(1)}", f"level_{m.group(2)}", int(m.group(2)))
+    if is_qa:
+        metrics["qa_verdict"] = qa_verdict
+        metrics["qa_failures"] = qa_failures
 
-    return ("unknown", stem, None)
+    return metrics
 
 
-def extract_qa_verdict(events):
+def _process_file(logfile):
     """
-    Scan QA log events for pass/fail verdict.
-    Returns 'pass', 'fail', or 'unknown'.
-    Also returns a list of failure descriptions found during testing.
+    Return the metrics for one log file, reusing the cached result while the
+    file's mtime and size are unchanged. Runs in a worker process for large
+    log directories, so it must stay at module level and return only plain data.
     """
-    failures = []
-    final_verdict = "unknown"
-
-    for ev in events:
-        if ev.get("event") != "assistant":
-            continue
-        content = ev.get("content", [])
-        if not isinstance(content, list):
-            continue
-        for c in content:
-            if c.get("type") != "text":
-                continue
-            txt = c["text"].lower()
-            # Look for clear final verdicts (usually near end of QA)
-            if any(phrase in txt for phrase in [
-                "all tests pass", "all tests passed", "passed - all",
-                "result: passed", "result: all", "result: ok",
-                "passed - all tests successful",
-            ]):
-                final_verdict = "pass"
-            # Detect actual test failures (not just mentions of writing a failures report)
-            # Only flag if the message indicates actual test failures found
-            if re.search(r'(?:found|have|got|revealed)\s+\d+\s+test\s+failure', txt):
-                snippet = c["text"][:200].replace("\n", " ").strip()
-                failures.append(snippet)
-            elif re.search(r'\d+\s+(?:tests?\s+)?(?:failed|failing)', txt):
-                # Skip false positives like "write the test failure report" or "failures file (empty"
-                if not re.search(r'(?:write|create|artifact|report|empty|which will be)', txt):
-                    snippet = c["text"][:200].replace("\n", " ").strip()
-                    failures.append(snippet)
-
-    return final_verdict, failures
-
-
-def count_tool_calls(events):
-    """Count how many tool_use calls appear in assistant events."""
-    count = 0
-    for ev in events:
-        if ev.get("event") != "assistant":
-            continue
-        content = ev.get("content", [])
-        if not isinstance(content, list):
-            continue
-        for c in content:
-            if c.get("type") == "tool_use":
-                count += 1
-    return count
-
-
-def count_assistant_turns(events):
-    """Count distinct assistant turns."""
-    turns = set()
-    for ev in events:
-        if ev.get("event") == "assistant" and "turn" in ev:
-            turns.add(ev["turn"])
-    return len(turns)
+    st = logfile.stat()
+    key = (METRICS_CACHE_VERSION, st.st_mtime_ns, st.st_size)
+    cache = METRICS_CACHE_DIR / f"{logfile.stem}.pkl"
+    try:
+        with open(cache, "rb") as f:
+            cached_key, metrics = pickle.load(f)
+        if cached_key == key:
+            return metrics
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    metrics = _summarize_file(logfile)
+    # The cache only saves time, so a directory that cannot be written is
+    # skipped. Entries are written under a temporary name and renamed into
+    # place, so an interrupted worker never leaves a truncated one behind.
+    tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump((key, metrics), f)
+        os.replace(tmp, cache)
+    except OSError:
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+    return metrics
 
 
 # ---------------------------------------------------------------------------
@@ -190,77 +367,30 @@ def run_analysis():
     all_logs = {}          # filename -> {events, category, issue, iter, ...}
     planning_data = {}     # agent_name -> metrics dict
     issue_writer_data = {} # issue -> metrics dict
-    # For coding pipeline, we group by issue
-    # Each issue can have multiple iterations
-    issue_pipeline = defaultdict(lambda: {
-        "coder_iters": [],      # list of (iter_num, metrics)
-        "reviewer_iters": [],   # list of (iter_id, metrics)
-        "qa_iters": [],         # list of (iter_id, metrics, verdict, failures)
-        "synthesizer_iters": [],# list of (iter_id, metrics)
-    })
+    # Coder/reviewer/QA/synthesizer logs are grouped by issue from the metric
+    # columns below; each issue can have multiple iterations
     merger_data = {}
     integration_data = {}
     workspace_data = {"setup": {}, "cleanup": {}}
 
-    for logfile in log_files:
-        fname = logfile.name
-        events = parse_log(logfile)
-        if not events:
+    if len(log_files) < PARALLEL_MIN_FILES:
+        processed = map(_process_file, log_files)
+    else:
+        # Files are independent, so parse them across processes; only the
+        # small metrics dicts are sent back, never the raw events.
+        with ProcessPoolExecutor() as ex:
+            chunksize = max(1, len(log_files) // (4 * (os.cpu_count() or 1)))
+            processed = list(ex.map(_process_file, log_files, chunksize=chunksize))
+
+    for metrics in processed:
+        if metrics is None:
             continue
-
-        category, issue, iter_info = classify_log(fname)
-
-        # Extract basic metrics
-        first_ts = events[0].get("ts", 0)
-        last_ts = events[-1].get("ts", 0)
-        duration_s = last_ts - first_ts
-
-        # From result event
-        result_ev = None
-        end_ev = None
-        for ev in events:
-            if ev.get("event") == "result":
-                result_ev = ev
-            if ev.get("event") == "end":
-                end_ev = ev
-
-        num_turns = 0
-        cost_usd = 0.0
-        duration_ms_reported = 0
-        is_error = False
-        model = "unknown"
-
-        if result_ev:
-            num_turns = result_ev.get("num_turns", 0)
-            cost_usd = result_ev.get("cost_usd", 0.0)
-            duration_ms_reported = result_ev.get("duration_ms", 0)
-        if end_ev:
-            is_error = end_ev.get("is_error", False)
-
-        # Get model from start event
-        start_ev = events[0] if events[0].get("event") == "start" else None
-        if start_ev:
-            model = start_ev.get("model", "unknown")
-
-        tool_calls = count_tool_calls(events)
-        assistant_turns = count_assistant_turns(events)
-
-        metrics = {
-            "file": fname,
-            "category": category,
-            "issue": issue,
-            "iter": iter_info,
-            "first_ts": first_ts,
-            "last_ts": last_ts,
-            "duration_s": duration_s,
-            "duration_ms_reported": duration_ms_reported,
-            "num_turns": num_turns,
-            "assistant_turns": assistant_turns,
-            "tool_calls": tool_calls,
-            "cost_usd": cost_usd,
-            "is_error": is_error,
-            "model": model,
-        }
+        # Cached and pool results arrive as fresh string copies; intern the
+        # ones used as dict keys and compared below so equal names share one
+        # object and compare by identity
+        fname = metrics["file"] = sys.intern(metrics["file"])
+        category = metrics["category"] = sys.intern(metrics["category"])
+        issue = metrics["issue"] = sys.intern(metrics["issue"])
 
         all_logs[fname] = metrics
 
@@ -270,21 +400,6 @@ def run_analysis():
         elif category == "issue_writer":
             issue_writer_data[issue] = metrics
 
-        elif category == "coder":
-            issue_pipeline[issue]["coder_iters"].append((iter_info, metrics))
-
-        elif category == "reviewer":
-            issue_pipeline[issue]["reviewer_iters"].append((iter_info, metrics))
-
-        elif category == "qa":
-            verdict, failures = extract_qa_verdict(events)
-            metrics["qa_verdict"] = verdict
-            metrics["qa_failures"] = failures
-            issue_pipeline[issue]["qa_iters"].append((iter_info, metrics))
-
-        elif category == "synthesizer":
-            issue_pipeline[issue]["synthesizer_iters"].append((iter_info, metrics))
-
         elif category == "merger":
             merger_data[issue] = metrics
 
@@ -297,6 +412,17 @@ def run_analysis():
         elif category == "workspace_cleanup":
             workspace_data["cleanup"][issue] = metrics
 
+    # Columnar copy of the per-file metrics for the aggregations below
+    records = list(all_logs.values())
+    cat_id = np.array([CAT_ID[m["category"]] for m in records], dtype=np.int8)
+    first_ts = np.array([m["first_ts"] for m in records], dtype=np.float64)
+    last_ts = np.array([m["last_ts"] for m in records], dtype=np.float64)
+    durations = np.array([m["duration_s"] for m in records], dtype=np.float64)
+    costs = np.array([m["cost_usd"] for m in records], dtype=np.float64)
+    num_turns = np.array([m["num_turns"] for m in records], dtype=np.int64)
+    tool_calls = np.array([m["tool_calls"] for m in records], dtype=np.int64)
+    assistant_turns = np.array([m["assistant_turns"] for m in records], dtype=np.int64)
+
     # -----------------------------------------------------------------------
     # TEXT SUMMARY
     # -----------------------------------------------------------------------
@@ -306,13 +432,13 @@ def run_analysis():
     print(sep)
 
     # Overall timeline
-    all_ts = [m["first_ts"] for m in all_logs.values()] + [m["last_ts"] for m in all_logs.values()]
-    pipeline_start = min(all_ts)
-    pipeline_end = max(all_ts)
+    # Events are not guaranteed to be in ts order, so use both columns
+    pipeline_start = min(first_ts.min(), last_ts.min()).item()
+    pipeline_end = max(first_ts.max(), last_ts.max()).item()
     total_wall = pipeline_end - pipeline_start
-    total_cost = sum(m["cost_usd"] for m in all_logs.values())
-    total_turns = sum(m["num_turns"] for m in all_logs.values())
-    total_tool_calls = sum(m["tool_calls"] for m in all_logs.values())
+    total_cost = costs.sum().item()
+    total_turns = num_turns.sum().item()
+    total_tool_calls = tool_calls.sum().item()
 
     print(f"\nPipeline start : {ts_to_str(pipeline_start)}")
     print(f"Pipeline end   : {ts_to_str(pipeline_end)}")
@@ -357,29 +483,53 @@ def run_analysis():
     print("  CODING PIPELINE PER ISSUE")
     print(sep)
 
+    # Per-issue iteration lists and phase totals, from the metric columns
+    phase_of_cat = np.full(len(CATEGORIES), -1, dtype=np.int8)
+    for col, (cat, _) in enumerate(ISSUE_PHASES):
+        phase_of_cat[CAT_ID[cat]] = col
+    phase = phase_of_cat[cat_id]
+    issue_rows = np.flatnonzero(phase >= 0).tolist()
+    issue_names = sorted({records[r]["issue"] for r in issue_rows})
+    issue_index = {name: i for i, name in enumerate(issue_names)}
+    issue_id = np.array([issue_index[records[r]["issue"]] for r in issue_rows], dtype=np.int32)
+    issue_rows = np.array(issue_rows, dtype=np.intp)
+    phase = phase[issue_rows]
+
+    # Group by (issue, phase) with one sort, then sum each contiguous run. The
+    # key is the cell's flat index into an (issues x phases) table; rows in a
+    # cell are in start order, which is also the order iterations are listed in.
+    key = issue_id.astype(np.int64) * len(ISSUE_PHASES) + phase
+    order = np.lexsort((first_ts[issue_rows], key))
+    issue_rows = issue_rows[order]
+    cells, starts = np.unique(key[order], return_index=True)
+    shape = (len(issue_names), len(ISSUE_PHASES))
+    phase_dur = np.zeros(shape)
+    phase_cost = np.zeros(shape)
+    phase_start = np.zeros(shape, dtype=np.int64)
+    phase_count = np.zeros(shape, dtype=np.int64)
+    phase_dur.flat[cells] = np.add.reduceat(durations[issue_rows], starts)
+    phase_cost.flat[cells] = np.add.reduceat(costs[issue_rows], starts)
+    phase_start.flat[cells] = starts
+    phase_count.flat[cells] = np.diff(starts, append=len(key))
+    iterations = phase_count[:, 0]
+
     # Collect per-issue totals for chart data
     issue_totals = {}
-    for issue_name in sorted(issue_pipeline.keys()):
-        data = issue_pipeline[issue_name]
+    for idx, issue_name in enumerate(issue_names):
         print(f"\n  Issue: {issue_name}")
         print(f"  {'-' * 70}")
 
-        # Sort iterations by timestamp
-        coder_iters = sorted(data["coder_iters"], key=lambda x: x[1]["first_ts"])
-        reviewer_iters = sorted(data["reviewer_iters"], key=lambda x: x[1]["first_ts"])
-        qa_iters = sorted(data["qa_iters"], key=lambda x: x[1]["first_ts"])
-        synth_iters = sorted(data["synthesizer_iters"], key=lambda x: x[1]["first_ts"])
-
-        num_iterations = len(coder_iters)
-        total_coder = sum(m["duration_s"] for _, m in coder_iters)
-        total_reviewer = sum(m["duration_s"] for _, m in reviewer_iters)
-        total_qa = sum(m["duration_s"] for _, m in qa_iters)
-        total_synth = sum(m["duration_s"] for _, m in synth_iters)
+        # Each phase's (iter, metrics) pairs, already in timestamp order
+        coder_iters, reviewer_iters, qa_iters, synth_iters = (
+            [(records[r]["iter"], records[r]) for r in issue_rows[start:start + count].tolist()]
+            for start, count in zip(phase_start[idx].tolist(), phase_count[idx].tolist())
+        )
+
+        num_iterations = int(iterations[idx])
+        total_coder, total_reviewer, total_qa, total_synth = phase_dur[idx].tolist()
         issue_total = total_coder + total_reviewer + total_qa + total_synth
-        issue_cost = (sum(m["cost_usd"] for _, m in coder_iters) +
-                      sum(m["cost_usd"] for _, m in reviewer_iters) +
-                      sum(m["cost_usd"] for _, m in qa_iters) +
-                      sum(m["cost_usd"] for _, m in synth_iters))
+        cost_coder, cost_reviewer, cost_qa, cost_synth = phase_cost[idx].tolist()
+        issue_cost = cost_coder + cost_reviewer + cost_qa + cost_synth
 
         issue_totals[issue_name] = {
             "coding": total_coder,
@@ -457,8 +607,18 @@ def run_analysis():
     print(f"\n{sep}")
     print("  AGENT TURN COUNTS & TOOL CALLS (all agents)")
     print(sep)
-    sorted_by_turns = sorted(all_logs.values(), key=lambda x: x["assistant_turns"], reverse=True)
-    for m in sorted_by_turns[:30]:
+    # Select the top 30 without sorting every log. Logs tied at the cut-off
+    # are taken in file order, as the stable sort used to.
+    top_n = min(30, len(records))
+    top = np.empty(0, dtype=np.intp)
+    if top_n:
+        cutoff = np.partition(assistant_turns, len(records) - top_n)[len(records) - top_n]
+        above = np.flatnonzero(assistant_turns > cutoff)
+        tied = np.flatnonzero(assistant_turns == cutoff)[:top_n - len(above)]
+        top = np.concatenate([above, tied])
+        top = top[np.lexsort((top, -assistant_turns[top]))]
+    for i in top.tolist():
+        m = records[i]
         print(f"  {m['file']:55s}  turns={m['assistant_turns']:3d}  "
               f"tools={m['tool_calls']:3d}  dur={fmt_duration(m['duration_s']):>8s}  "
               f"cost=${m['cost_usd']:.2f}")
@@ -467,11 +627,17 @@ def run_analysis():
     print(f"\n{sep}")
     print("  COST BREAKDOWN BY CATEGORY")
     print(sep)
-    cost_by_cat = defaultdict(float)
-    for m in all_logs.values():
-        cost_by_cat[m["category"]] += m["cost_usd"]
-    for cat in sorted(cost_by_cat.keys(), key=lambda c: -cost_by_cat[c]):
-        print(f"  {cat:25s}  ${cost_by_cat[cat]:.2f}")
+    # Tally over the category codes; only categories that have logs are listed
+    cat_cost = np.bincount(cat_id, weights=costs, minlength=len(CATEGORIES))
+    cat_seen = np.bincount(cat_id, minlength=len(CATEGORIES)) > 0
+    # Highest cost first; equal costs are listed by name so the order does not
+    # depend on the CATEGORIES code table. The notebook's cost chart keeps it.
+    cost_by_cat = dict(sorted(
+        ((CATEGORIES[i], cat_cost[i].item()) for i in np.flatnonzero(cat_seen)),
+        key=lambda kv: (-kv[1], kv[0]),
+    ))
+    for cat, cost in cost_by_cat.items():
+        print(f"  {cat:25s}  ${cost:.2f}")
     print(f"  {'TOTAL':25s}  ${total_cost:.2f}")
 
     # Identify issues needing re-coding (iterations > 1)
@@ -528,7 +694,7 @@ def run_analysis():
 def make_notebook(data):
     """Generate a self-contained Jupyter notebook with embedded data."""
 
-    data_json = json.dumps(data, indent=2)
+    data_json = dump_json(data).decode()
 
     cells = []
 
@@ -562,7 +728,12 @@ def make_notebook(data):
 import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
+from matplotlib.collections import PolyCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import numpy as np
+import shutil
+import subprocess
 from collections import defaultdict
 
 plt.rcParams['figure.figsize'] = (14, 6)
@@ -571,6 +742,9 @@ plt.rcParams['font.size'] = 10
 plt.rcParams['axes.titlesize'] = 13
 plt.rcParams['axes.labelsize'] = 11
 
+# Raster resolution for the charts saved straight from an Agg Figure
+SAVE_DPI = 110
+
 # Color palette
 COLORS = {
     'coding': '#4C72B0',
@@ -586,6 +760,27 @@ COLORS = {
 def fmt_dur(s):
     m, sec = divmod(int(s), 60)
     return f'{m}m {sec}s' if m else f'{sec}s'
+
+# Losslessly re-encode saved PNGs when optipng is on PATH
+OPTIPNG = shutil.which('optipng')
+
+def optimize_png(path):
+    if OPTIPNG:
+        subprocess.run([OPTIPNG, '-quiet', '-o7', path], check=False)
+
+# Agg figures kept per chart, so re-running a cell clears and redraws the
+# same Figure instead of building a new one
+_FIGS = {}
+
+def _get_or_make_fig(key, figsize):
+    fig = _FIGS.get(key)
+    if fig is None:
+        fig = _FIGS[key] = Figure(figsize=figsize, constrained_layout=True)
+        FigureCanvasAgg(fig)
+    else:
+        fig.set_size_inches(figsize)
+        fig.clear()
+    return fig, fig.add_subplot()
 """)
 
     # --- Chart 1: Planning durations ---
@@ -781,54 +976,53 @@ cat_colors = {
     'workspace_cleanup': '#FFBB78',
 }
 
-# Sort all agents by start time
-sorted_agents = sorted(agents, key=lambda a: a.get('duration_s', 0), reverse=True)
-# Actually sort by something more meaningful - category then start
-# Let's group by category
-from collections import defaultdict
-by_cat = defaultdict(list)
-for a in agents:
-    by_cat[a['category']].append(a)
-
-fig, ax = plt.subplots(figsize=(16, 10))
-yticks = []
-ylabels = []
-y = 0
-for cat in cat_order:
-    if cat not in by_cat:
-        continue
-    items = sorted(by_cat[cat], key=lambda a: a.get('duration_s', 0), reverse=True)
-    for a in items:
-        # We don't have absolute start times in the serialized data, so use duration
-        dur = a['duration_s']
-        color = cat_colors.get(cat, '#8C8C8C')
-        name = a['file'].replace('.jsonl', '')
-        ax.barh(y, dur, left=0, height=0.7, color=color, alpha=0.8, edgecolor='white')
-        if dur > 20:
-            ax.text(dur + 2, y, fmt_dur(dur), va='center', fontsize=7)
-        yticks.append(y)
-        ylabels.append(name[:35])
-        y += 1
-
-ax.set_yticks(yticks)
-ax.set_yticklabels(ylabels, fontsize=6)
+# Order by category rank, longest first within each category; a single
+# sort replaces the per-category regroup-and-sort
+rank = {c: i for i, c in enumerate(cat_order)}
+resolved = {c: cat_colors.get(c, '#8C8C8C') for c in cat_order}
+ordered = sorted((a for a in agents if a['category'] in rank),
+                 key=lambda a: (rank[a['category']], -a.get('duration_s', 0)))
+
+fig, ax = _get_or_make_fig('timeline', (16, 10))
+# We don't have absolute start times in the serialized data, so use duration
+durs = np.array([a['duration_s'] for a in ordered])
+colors = [resolved[a['category']] for a in ordered]
+ylabels = [a['file'].replace('.jsonl', '')[:35] for a in ordered]
+yticks = np.arange(len(ordered))
+
+# Only bars longer than 20s get a duration label
+for y in np.nonzero(durs > 20)[0]:
+    ax.text(durs[y] + 2, y, fmt_dur(durs[y]), va='center', fontsize=7)
+
+# All bars as one PolyCollection: rectangles (0, y-0.35)..(dur, y+0.35)
+verts = np.zeros((len(durs), 4, 2))
+verts[:, 1:3, 0] = durs[:, None]
+verts[:, :2, 1] = yticks[:, None] - 0.35
+verts[:, 2:, 1] = yticks[:, None] + 0.35
+bars = PolyCollection(verts, facecolors=colors, edgecolors='white', alpha=0.8)
+bars.sticky_edges.x.append(0)
+ax.add_collection(bars)
+ax.autoscale_view()
+ax.set_yticks(yticks, labels=ylabels, fontsize=6)
 ax.set_xlabel('Duration (seconds)')
 ax.set_title('All Agent Durations (grouped by category)')
 
 # Legend
-patches = [mpatches.Patch(color=cat_colors.get(c, '#8C8C8C'), label=c)
-           for c in cat_order if c in by_cat]
+present = {a['category'] for a in ordered}
+patches = [mpatches.Patch(color=resolved[c], label=c)
+           for c in cat_order if c in present]
 ax.legend(handles=patches, loc='lower right', fontsize=8)
 ax.invert_yaxis()
-plt.tight_layout()
-plt.savefig('_chart_timeline.png', bbox_inches='tight')
-plt.show()
+fig.savefig('_chart_timeline.png', dpi=SAVE_DPI)
+optimize_png('_chart_timeline.png')
+fig
 """)
 
     # --- Chart 9: Cost vs Duration scatter ---
     md("## 9. Cost vs Duration per Agent (scatter)")
     code("""agents = DATA['all_agents']
-cats = list(set(a['category'] for a in agents))
+# Categories in first-seen order, so the legend is stable between runs
+cats = list(dict.fromkeys(a['category'] for a in agents))
 cat_colors_map = {
     'planning': '#CCB974', 'issue_writer': '#DA8BC3',
     'coder': '#4C72B0', 'reviewer': '#55A868', 'qa': '#C44E52',
@@ -837,21 +1031,22 @@ cat_colors_map = {
     'workspace_cleanup': '#FFBB78', 'unknown': '#999999',
 }
 
-fig, ax = plt.subplots(figsize=(12, 7))
-for cat in cats:
-    subset = [a for a in agents if a['category'] == cat]
-    durs = [a['duration_s'] for a in subset]
-    costs = [a['cost'] for a in subset]
-    color = cat_colors_map.get(cat, '#999999')
-    ax.scatter(durs, costs, label=cat, color=color, s=60, alpha=0.7, edgecolors='white')
+fig, ax = _get_or_make_fig('cost_vs_dur', (12, 7))
+# One scatter call for all agents, coloured per point by category
+durs = np.array([a['duration_s'] for a in agents])
+costs = np.array([a['cost'] for a in agents])
+colors = [cat_colors_map.get(a['category'], '#999999') for a in agents]
+ax.scatter(durs, costs, c=colors, s=60, alpha=0.7, edgecolors='white')
 
 ax.set_xlabel('Duration (seconds)')
 ax.set_ylabel('Cost (USD)')
 ax.set_title('Cost vs Duration per Agent Invocation')
-ax.legend(fontsize=8)
-plt.tight_layout()
-plt.savefig('_chart_cost_vs_dur.png', bbox_inches='tight')
-plt.show()
+patches = [mpatches.Patch(color=cat_colors_map.get(c, '#999999'), label=c)
+           for c in cats]
+ax.legend(handles=patches, fontsize=8)
+fig.savefig('_chart_cost_vs_dur.png', dpi=SAVE_DPI)
+optimize_png('_chart_cost_vs_dur.png')
+fig
 """)
 
     # --- Summary stats ---
@@ -873,11 +1068,12 @@ print()
 print(f"{'Issue':<40s} {'Total':>8s} {'Code':>7s} {'Review':>7s} {'QA':>7s} {'Synth':>7s} {'Iters':>5s} {'Cost':>7s}")
 print('-' * 90)
 it = DATA['issue_totals']
-for issue in sorted(it.keys(), key=lambda k: -it[k]['total']):
-    d = it[issue]
-    print(f"{issue:<40s} {fmt_dur(d['total']):>8s} {fmt_dur(d['coding']):>7s} "
-          f"{fmt_dur(d['review']):>7s} {fmt_dur(d['qa']):>7s} {fmt_dur(d['synthesis']):>7s} "
-          f"{d['iterations']:>5d} ${d['cost']:.2f}")
+rows = [(issue, fmt_dur(d['total']), fmt_dur(d['coding']), fmt_dur(d['review']),
+         fmt_dur(d['qa']), fmt_dur(d['synthesis']), d['iterations'], d['cost'])
+        for issue, d in sorted(it.items(), key=lambda kv: -kv[1]['total'])]
+if rows:
+    print('\\n'.join(f"{r[0]:<40s} {r[1]:>8s} {r[2]:>7s} {r[3]:>7s} {r[4]:>7s} {r[5]:>7s} "
+                    f"{r[6]:>5d} ${r[7]:.2f}" for r in rows))
 """)
 
     # --- Assemble notebook ---
@@ -898,8 +1094,7 @@ for issue in sorted(it.keys(), key=lambda k: -it[k]['total']):
         "cells": cells,
     }
 
-    with open(NOTEBOOK_PATH, "w") as f:
-        json.dump(notebook, f, indent=1)
+    NOTEBOOK_PATH.write_bytes(dump_json(notebook))
 
     print(f"\nNotebook written to: {NOTEBOOK_PATH}")
 
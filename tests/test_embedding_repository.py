@@ -0,0 +1,255 @@
+"""Tests for the in-memory EmbeddingRepository."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.repositories.embedding import EmbeddingRecord, EmbeddingRepository
+
+_DIM = 8
+
+
+def _basis(i: int, scale: float = 1.0) -> list[float]:
+    v = [0.0] * _DIM
+    v[i] = scale
+    return v
+
+
+def _record(n: int, embedding: list[float]) -> EmbeddingRecord:
+    return EmbeddingRecord(
+        embedding_id=f"emb-{n}",
+        request_id=f"req-{n}",
+        embedding=np.asarray(embedding, dtype=np.float32),
+    )
+
+
+@pytest.fixture()
+def repo() -> EmbeddingRepository:
+    return EmbeddingRepository(dim=_DIM)
+
+
+class TestLookup:
+    def test_find_by_request_id(self, repo):
+        record = _record(1, _basis(1))
+        repo.save(_record(0, _basis(0)))
+        repo.save(record)
+        assert repo.find_by_request_id("req-1") is record
+        assert repo.find_by_request_id("missing") is None
+
+    def test_find_by_embedding_id(self, repo):
+        record = _record(4, _basis(4))
+        repo.save(record)
+        assert repo.find_by_embedding_id("emb-4") is record
+        assert repo.find_by_embedding_id("missing") is None
+
+    def test_duplicate_request_id_returns_first_saved(self, repo):
+        first = _record(0, _basis(0))
+        repo.save(first)
+        duplicate = EmbeddingRecord(
+            embedding_id="other", request_id="req-0", embedding=np.asarray(_basis(1), dtype=np.float32)
+        )
+        repo.save(duplicate)
+        assert repo.find_by_request_id("req-0") is first
+
+
+class TestSearch:
+    def test_empty_repo_returns_no_results(self, repo):
+        assert repo.search(_basis(0)) == []
+
+    def test_ranks_by_cosine_similarity(self, repo):
+        repo.save(_record(0, _basis(0)))
+        repo.save(_record(1, [1.0, 1.0] + [0.0] * (_DIM - 2)))
+        repo.save(_record(2, _basis(1)))
+
+        results = repo.search(_basis(0), top_k=3)
+
+        assert [r.embedding_id for r, _ in results] == ["emb-0", "emb-1", "emb-2"]
+        assert results[0][1] == pytest.approx(1.0)
+        assert results[1][1] == pytest.approx(2 ** -0.5)
+        assert results[2][1] == pytest.approx(0.0)
+
+    def test_similarity_ignores_vector_magnitude(self, repo):
+        repo.save(_record(0, _basis(3, scale=42.0)))
+        (_, score), = repo.search(_basis(3, scale=0.5))
+        assert score == pytest.approx(1.0)
+
+    def test_top_k_limits_results(self, repo):
+        for i in range(_DIM):
+            repo.save(_record(i, _basis(i)))
+        assert len(repo.search(_basis(0), top_k=3)) == 3
+        assert len(repo.search(_basis(0), top_k=100)) == _DIM
+
+    def test_zero_vector_scores_zero(self, repo):
+        repo.save(_record(0, [0.0] * _DIM))
+        (_, score), = repo.search(_basis(0))
+        assert score == 0.0
+
+    def test_many_saves_are_all_searchable(self, repo):
+        for i in range(100):
+            repo.save(_record(i, _basis(i % _DIM, scale=i + 1)))
+        assert repo.count() == 100
+        results = repo.search(_basis(5), top_k=20)
+        assert len(results) == 20
+        assert all(r.embedding[5] > 0 for r, _ in results[:12])
+
+    def test_save_many_matches_individual_saves(self, repo):
+        single = EmbeddingRepository(dim=_DIM)
+        records = [_record(i, _basis(i % _DIM, scale=i + 1)) for i in range(40)]
+        for record in records:
+            single.save(record)
+        repo.save_many(records[:1])
+        repo.save_many(records[1:])
+        repo.save_many([])
+
+        assert repo.count() == 40
+        assert repo.find_by_embedding_id("emb-39") is records[39]
+        assert repo.search(_basis(2), top_k=5) == single.search(_basis(2), top_k=5)
+
+
+class TestAnnIndex:
+    def test_exact_search_when_threshold_disabled(self):
+        repo = EmbeddingRepository(dim=_DIM, ann_threshold=None)
+        for i in range(50):
+            repo.save(_record(i, _basis(i % _DIM)))
+        assert not repo.ann_active
+
+    def test_index_results_match_exact_search(self):
+        pytest.importorskip("hnswlib")
+        import random
+
+        rng = random.Random(7)
+        vectors = [[rng.uniform(-1, 1) for _ in range(_DIM)] for _ in range(200)]
+        exact = EmbeddingRepository(dim=_DIM, ann_threshold=None)
+        approx = EmbeddingRepository(dim=_DIM, ann_threshold=20)
+        for i, v in enumerate(vectors):
+            exact.save(_record(i, v))
+            approx.save(_record(i, v))
+
+        assert approx.ann_active
+        batched = EmbeddingRepository(dim=_DIM, ann_threshold=20)
+        batched.save_many([_record(i, v) for i, v in enumerate(vectors[:10])])
+        batched.save_many([_record(i + 10, v) for i, v in enumerate(vectors[10:])])
+        assert batched.ann_active
+        assert batched.count() == len(vectors)
+        # Every row, including those appended after the index was built,
+        # must be reachable through it.
+        for i, v in enumerate(vectors):
+            assert batched.search(v, top_k=1)[0][0].embedding_id == f"emb-{i}"
+        query = vectors[123]
+        (top, score), *_ = approx.search(query, top_k=3)
+        assert top.embedding_id == "emb-123"
+        assert score == pytest.approx(1.0, abs=1e-5)
+        assert [r.embedding_id for r, _ in approx.search(query, top_k=3)] == [
+            r.embedding_id for r, _ in exact.search(query, top_k=3)
+        ]
+
+
+class TestQuantized:
+    def test_scores_carry_int8_rounding_error(self):
+        import random
+
+        rng = random.Random(13)
+        vectors = [[rng.uniform(-1, 1) for _ in range(_DIM)] for _ in range(20)]
+        exact = EmbeddingRepository(dim=_DIM, ann_threshold=None)
+        quantized = EmbeddingRepository(dim=_DIM, ann_threshold=None, quantize=True)
+        for i, v in enumerate(vectors):
+            exact.save(_record(i, v))
+            quantized.save(_record(i, v))
+
+        query = vectors[0]
+        expected = {r.embedding_id: s for r, s in exact.search(query, top_k=len(vectors))}
+        errors = [
+            abs(score - expected[record.embedding_id])
+            for record, score in quantized.search(query, top_k=len(vectors))
+        ]
+        # Rows are stored as 8-bit codes, so scores are close but not exact.
+        assert max(errors) < 2e-2
+        assert any(err > 0.0 for err in errors)
+
+    def test_axis_vector_scores_one(self):
+        repo = EmbeddingRepository(dim=_DIM, quantize=True)
+        repo.save(_record(0, _basis(0, scale=3.0)))
+        (_, score), = repo.search(_basis(0))
+        assert score == pytest.approx(1.0)
+
+    def test_results_match_exact_search(self):
+        import random
+
+        rng = random.Random(11)
+        vectors = [[rng.uniform(-1, 1) for _ in range(_DIM)] for _ in range(300)]
+        exact = EmbeddingRepository(dim=_DIM, ann_threshold=None)
+        quantized = EmbeddingRepository(dim=_DIM, ann_threshold=None, quantize=True)
+        for i, v in enumerate(vectors):
+            exact.save(_record(i, v))
+            quantized.save(_record(i, v))
+
+        query = vectors[42]
+        got = quantized.search(query, top_k=1)
+        assert got[0][0].embedding_id == "emb-42"
+        for (_, q_score), (_, e_score) in zip(
+            quantized.search(query, top_k=10), exact.search(query, top_k=10)
+        ):
+            assert q_score == pytest.approx(e_score, abs=2e-2)
+
+    def test_zero_vector_scores_zero(self):
+        repo = EmbeddingRepository(dim=_DIM, quantize=True)
+        repo.save(_record(0, [0.0] * _DIM))
+        (_, score), = repo.search(_basis(0))
+        assert score == 0.0
+
+    def test_ivfpq_candidates_are_reranked_exactly(self):
+        pytest.importorskip("faiss")
+        import random
+
+        rng = random.Random(3)
+        vectors = [[rng.uniform(-1, 1) for _ in range(_DIM)] for _ in range(400)]
+        exact = EmbeddingRepository(dim=_DIM, ann_threshold=None)
+        approx = EmbeddingRepository(dim=_DIM, ann_threshold=200, ann_backend="ivfpq")
+        for i, v in enumerate(vectors):
+            exact.save(_record(i, v))
+            approx.save(_record(i, v))
+
+        assert approx.ann_active
+        query = vectors[321]
+        (top, score), *_ = approx.search(query, top_k=3)
+        assert top.embedding_id == "emb-321"
+        assert score == pytest.approx(1.0, abs=1e-5)
+        expected = {r.embedding_id: s for r, s in exact.search(query, top_k=len(vectors))}
+        for record, got in approx.search(query, top_k=3):
+            assert got == pytest.approx(expected[record.embedding_id], abs=1e-6)
+
+    def test_unknown_backend_rejected(self):
+        with pytest.raises(ValueError, match="ann_backend"):
+            EmbeddingRepository(dim=_DIM, ann_backend="annoy")
+
+
+class TestConcurrency:
+    @pytest.mark.parametrize("backend, module", [("hnsw", "hnswlib"), ("ivfpq", "faiss")])
+    def test_saves_and_searches_from_threads_past_threshold(self, backend, module):
+        pytest.importorskip(module)
+        import random
+        from concurrent.futures import ThreadPoolExecutor
+
+        rng = random.Random(5)
+        vectors = [[rng.uniform(-1, 1) for _ in range(_DIM)] for _ in range(2000)]
+        repo = EmbeddingRepository(dim=_DIM, ann_threshold=300, ann_backend=backend)
+
+        def save_all():
+            for i, v in enumerate(vectors):
+                repo.save(_record(i, v))
+
+        def search_until_saved():
+            while repo.count() < len(vectors):
+                for _, score in repo.search(vectors[0], top_k=3):
+                    assert -1.0 - 1e-5 <= score <= 1.0 + 1e-5
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(save_all)]
+            futures += [pool.submit(search_until_saved) for _ in range(3)]
+            for future in futures:
+                future.result()
+
+        assert repo.count() == len(vectors)
+        (top, score), *_ = repo.search(vectors[1234], top_k=3)
+        assert top.embedding_id == "emb-1234"
+        assert score == pytest.approx(1.0, abs=1e-5)
@@ -104,7 +104,7 @@ class TestMatchSuccess:
 
         # Retrieve the stored embedding via the repository
         from app.routes.upload import _compute_embedding
-        emb = _compute_embedding(png)
+        emb = _compute_embedding(png).tolist()
 
         resp = client.post("/v1/match", json={"embedding": emb})
         assert resp.status_code == 200
@@ -120,3 +120,23 @@ class TestMatchErrors:
     def test_missing_embedding_returns_422(self, client):
         resp = client.post("/v1/match", json={})
         assert resp.status_code == 422
+
+    def test_non_numeric_embedding_returns_422(self, client):
+        resp = client.post("/v1/match", json={"embedding": ["x"] * _EMBEDDING_DIM})
+        assert resp.status_code == 422
+
+    def test_null_element_returns_422(self, client):
+        resp = client.post("/v1/match", json={"embedding": [None] * _EMBEDDING_DIM})
+        assert resp.status_code == 422
+
+    def test_float32_overflow_returns_422(self, client):
+        resp = client.post("/v1/match", json={"embedding": [1e39] * _EMBEDDING_DIM})
+        assert resp.status_code == 422
+
+    def test_object_embedding_returns_422(self, client):
+        resp = client.post("/v1/match", json={"embedding": {"a": 1}})
+        assert resp.status_code == 422
+
+    def test_openapi_schema_describes_embedding_array(self, client):
+        schema = client.get("/openapi.json").json()["components"]["schemas"]["MatchRequest"]
+        assert schema["properties"]["embedding"]["maxItems"] == _EMBEDDING_DIM
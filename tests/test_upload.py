@@ -89,6 +89,23 @@ class TestUploadSuccess:
         assert resp.status_code == 200
         assert resp.json()["content_type"] == "jpeg"
 
+    def test_upload_shorter_than_format_probe_accepted(self, client):
+        resp = client.post(
+            "/v1/upload",
+            files={"file": ("tiny.jpg", b"\xff\xd8\xff", "image/jpeg")},
+        )
+        assert resp.status_code == 200
+        assert resp.json()["content_type"] == "jpeg"
+
+    def test_upload_webp_accepted(self, client):
+        webp = b"RIFF" + b"\x00" * 4 + b"WEBP" + b"\x00" * 20
+        resp = client.post(
+            "/v1/upload",
+            files={"file": ("img.webp", webp, "image/webp")},
+        )
+        assert resp.status_code == 200
+        assert resp.json()["content_type"] == "webp"
+
     def test_multiple_uploads_have_unique_request_ids(self, client):
         ids = set()
         for i in range(3):
@@ -100,6 +117,16 @@ class TestUploadSuccess:
             ids.add(resp.json()["request_id"])
         assert len(ids) == 3
 
+    def test_lifespan_repository_stores_upload(self):
+        with TestClient(app) as lifespan_client:
+            resp = lifespan_client.post(
+                "/v1/upload",
+                files={"file": ("test.png", _make_png(), "image/png")},
+            )
+            assert resp.status_code == 200
+            repo = app.state.embedding_repo
+            assert repo.find_by_request_id(resp.json()["request_id"]) is not None
+
 
 class TestUploadErrors:
     def test_empty_file_returns_400(self, client):
@@ -116,9 +143,41 @@ class TestUploadErrors:
         )
         assert resp.status_code == 400
 
+    def test_oversized_file_returns_400(self, client):
+        big = _make_png() + b"\x00" * (10 * 1024 * 1024)
+        resp = client.post(
+            "/v1/upload",
+            files={"file": ("big.png", big, "image/png")},
+        )
+        assert resp.status_code == 400
+        assert "too large" in resp.json()["detail"]
+
+    def test_riff_without_webp_marker_returns_400(self, client):
+        resp = client.post(
+            "/v1/upload",
+            files={"file": ("clip.wav", b"RIFF\x00\x00\x00\x00WAVEfmt ", "audio/wav")},
+        )
+        assert resp.status_code == 400
+
     def test_invalid_binary_returns_400(self, client):
         resp = client.post(
             "/v1/upload",
             files={"file": ("bad.png", b"\x00\x01\x02\x03" * 10, "image/png")},
         )
         assert resp.status_code == 400
+
+
+class TestComputeEmbedding:
+    def test_repeat_data_reuses_cached_embedding(self):
+        from app.routes.upload import _compute_embedding, _embedding_from_digest
+
+        data = _make_png(color=(1, 2, 3))
+        first = _compute_embedding(data)
+        hits = _embedding_from_digest.cache_info().hits
+        second = _compute_embedding(data)
+
+        assert _embedding_from_digest.cache_info().hits == hits + 1
+        assert second is first
+        assert first.dtype.name == "float32"
+        assert not first.flags.writeable
+        assert float(first @ first) == pytest.approx(1.0, abs=1e-5)